@@ -1,9 +1,8 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from app.graph.state import TripState
-from app.core.prompts import ACTIVITIES_SYSTEM_PROMPT
-from app.tools.web_search import web_search_tool
-import os
+from app.core.llm import invoke_chain
+from app.tools.web_search import search_all
+from app.tools.search_ranking import build_search_context
+from app.tools.mocks import mock_latency, use_mock_data
 
 async def activities_node(state: TripState):
     """
@@ -14,7 +13,6 @@ async def activities_node(state: TripState):
     spec = state['spec']
     research_notes = state.get('research_notes', '')
     weather_info = state.get('weather_info', '')
-    hotel_recommendations = state.get('hotel_recommendations', '')
 
     # Calculate trip duration
     try:
@@ -27,9 +25,8 @@ async def activities_node(state: TripState):
         num_days = 3  # Default fallback
 
     # Check for API key to decide execution mode
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-    if not project:
+    if use_mock_data():
+        await mock_latency("search", "llm")
         # Provide mock activities with booking links
         activities_context = f"\n\n=== ACTIVITIES & EXPERIENCES ===\n"
         activities_context += f"Based on your interests: {', '.join(spec.interests) if spec.interests else 'general sightseeing'}\n\n"
@@ -83,34 +80,12 @@ async def activities_node(state: TripState):
         f"{spec.destination} food tours and dining experiences"
     ]
 
-    search_results = []
-    for query in search_queries:
-        try:
-            results = web_search_tool.invoke({"query": query, "max_results": 4})
-            search_results.extend(results)
-        except Exception as e:
-            print(f"Search error for '{query}': {e}")
+    search_results = await search_all(search_queries, max_results=4)
 
     # Format search results for LLM
-    search_context = "\n\n".join([
-        f"**{r['title']}**\n{r['snippet']}\nSource: {r['url']}"
-        for r in search_results[:15]
-    ])
-
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.4,
-        max_tokens=8000
-    )
-
-    prompt = ChatPromptTemplate.from_template(
-        ACTIVITIES_SYSTEM_PROMPT + "\n\nWeb Search Results:\n{search_context}"
-    )
-    chain = prompt | llm
-
-    response = await chain.ainvoke({
+    search_context = build_search_context(search_results, " ".join(search_queries + spec.interests), max_results=15)
+
+    content = await invoke_chain("activities", {
         "destination": spec.destination,
         "dates": spec.dates,
         "num_days": num_days,
@@ -120,8 +95,7 @@ async def activities_node(state: TripState):
         "interests": ", ".join(spec.interests) if spec.interests else "general sightseeing",
         "research_notes": research_notes,
         "weather_info": weather_info,
-        "hotel_recommendations": hotel_recommendations,
         "search_context": search_context
     })
 
-    return {"activities_recommendations": response.content}
+    return {"activities_recommendations": content}
@@ -1,9 +1,35 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from app.graph.state import TripState
-from app.core.prompts import BUDGET_SYSTEM_PROMPT
-from app.tools.web_search import web_search_tool
-import os
+from app.core.llm import invoke_structured
+from app.schemas.agents import BudgetEstimate
+from app.schemas.itinerary import BudgetBreakdown
+from app.tools.web_search import search_all
+from app.tools.search_ranking import build_search_context
+from app.tools.mocks import mock_latency, use_mock_data
+from typing import List, Optional
+
+def format_budget(budget: BudgetBreakdown, spec, num_days: int, notes: Optional[List[str]] = None) -> str:
+    """Text rendering of the breakdown for agents that read prose context."""
+    per_person_daily = budget.total_estimated / max(spec.travelers, 1) / max(num_days, 1)
+    budget_context = f"""
+=== BUDGET BREAKDOWN ===
+Trip Duration: {num_days} days
+Budget Tier: {spec.budget_tier}
+Travelers: {spec.travelers}
+
+Estimated Costs ({budget.currency}):
+• Flights: ${budget.flights:.2f}
+• Accommodation: ${budget.accommodation:.2f}
+• Food & Dining: ${budget.food:.2f}
+• Activities: ${budget.activities:.2f}
+• Local Transport: ${budget.transport_local:.2f}
+
+TOTAL ESTIMATED: ${budget.total_estimated:.2f} {budget.currency}
+
+Daily Budget Per Person (all-in): ${per_person_daily:.2f}/day
+"""
+    if notes:
+        budget_context += "\nNotes:\n" + "".join(f"• {note}\n" for note in notes)
+    return budget_context
 
 async def budget_node(state: TripState):
     """
@@ -26,9 +52,8 @@ async def budget_node(state: TripState):
         num_days = 3  # Default fallback
 
     # Check for API key to decide execution mode
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-    if not project:
+    if use_mock_data():
+        await mock_latency("search", "llm")
         # Provide mock budget breakdown
         budget_multiplier = {
             "low": 75,
@@ -37,27 +62,17 @@ async def budget_node(state: TripState):
             "luxury": 600
         }.get(spec.budget_tier, 150)
 
-        daily_budget = budget_multiplier * spec.travelers
-        total = daily_budget * num_days
-
-        budget_context = f"""
-=== BUDGET BREAKDOWN ===
-Trip Duration: {num_days} days
-Budget Tier: {spec.budget_tier}
-Travelers: {spec.travelers}
-
-Estimated Costs (USD):
-• Flights: ${300 * spec.travelers:.2f}
-• Accommodation: ${(budget_multiplier * 0.4) * num_days:.2f}
-• Food & Dining: ${(budget_multiplier * 0.3) * num_days:.2f}
-• Activities: ${(budget_multiplier * 0.2) * num_days:.2f}
-• Local Transport: ${(budget_multiplier * 0.1) * num_days:.2f}
-
-TOTAL ESTIMATED: ${total + (300 * spec.travelers):.2f} USD
-
-Daily Budget Per Person: ${budget_multiplier:.2f}/day
-"""
-        return {"budget_breakdown": budget_context}
+        # Per-person daily split across categories, scaled to the whole party
+        party_daily = budget_multiplier * spec.travelers
+        estimate = BudgetEstimate(
+            flights=300 * spec.travelers,
+            accommodation=party_daily * 0.4 * num_days,
+            food=party_daily * 0.3 * num_days,
+            activities=party_daily * 0.2 * num_days,
+            transport_local=party_daily * 0.1 * num_days,
+        )
+        budget = estimate.to_breakdown()
+        return {"budget": budget, "budget_breakdown": format_budget(budget, spec, num_days)}
 
     # Perform web searches for cost information
     search_queries = [
@@ -67,34 +82,12 @@ Daily Budget Per Person: ${budget_multiplier:.2f}/day
         f"{spec.destination} food prices restaurants 2026"
     ]
 
-    search_results = []
-    for query in search_queries:
-        try:
-            results = web_search_tool.invoke({"query": query, "max_results": 3})
-            search_results.extend(results)
-        except Exception as e:
-            print(f"Search error for '{query}': {e}")
+    search_results = await search_all(search_queries, max_results=3)
 
     # Format search results for LLM
-    search_context = "\n\n".join([
-        f"**{r['title']}**\n{r['snippet']}\nSource: {r['url']}"
-        for r in search_results[:10]
-    ])
-
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.2,
-        max_tokens=8000
-    )
-
-    prompt = ChatPromptTemplate.from_template(
-        BUDGET_SYSTEM_PROMPT + "\n\nWeb Search Results:\n{search_context}"
-    )
-    chain = prompt | llm
+    search_context = build_search_context(search_results, " ".join(search_queries), max_results=10)
 
-    response = await chain.ainvoke({
+    estimate = await invoke_structured("budget", {
         "origin": spec.origin,
         "destination": spec.destination,
         "dates": spec.dates,
@@ -106,6 +99,8 @@ Daily Budget Per Person: ${budget_multiplier:.2f}/day
         "hotel_recommendations": hotel_recommendations,
         "logistics_info": logistics_info,
         "search_context": search_context
-    })
+    }, BudgetEstimate, cache=True)
 
-    return {"budget_breakdown": response.content}
+    # Totals are summed locally rather than trusted from the LLM
+    budget = estimate.to_breakdown()
+    return {"budget": budget, "budget_breakdown": format_budget(budget, spec, num_days, estimate.notes)}
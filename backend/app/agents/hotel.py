@@ -1,10 +1,24 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from app.graph.state import TripState
-from app.core.prompts import HOTEL_SYSTEM_PROMPT
-from app.tools.web_search import web_search_tool
-from app.tools.mocks import BookingMocks
-import os
+from app.core.llm import invoke_structured
+from app.schemas.agents import HotelShortlist
+from app.schemas.itinerary import AccommodationOption
+from app.tools.web_search import search_all
+from app.tools.search_ranking import build_search_context
+from app.tools.mocks import BookingMocks, mock_latency, use_mock_data
+from typing import List
+
+def format_hotels(hotels: List[AccommodationOption]) -> str:
+    """Text rendering of the shortlist for agents that read prose context."""
+    hotel_context = "\n\n=== ACCOMMODATION OPTIONS ===\n"
+    for hotel in hotels:
+        hotel_context += f"\n• {hotel.name} ({hotel.area})\n"
+        hotel_context += f"  Price: ${hotel.price_per_night}/night\n"
+        if hotel.rating is not None:
+            hotel_context += f"  Rating: {hotel.rating}/5.0\n"
+        hotel_context += f"  Description: {hotel.description}\n"
+        if hotel.booking_link:
+            hotel_context += f"  Booking: {hotel.booking_link}\n"
+    return hotel_context
 
 async def hotel_node(state: TripState):
     """
@@ -16,19 +30,11 @@ async def hotel_node(state: TripState):
     weather_info = state.get('weather_info', '')
 
     # Check for API key to decide execution mode
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-    if not project:
+    if use_mock_data():
+        await mock_latency("search", "llm")
         # Use mock hotel data when no API key is available
         hotels = BookingMocks.search_hotels(spec.destination, spec.budget_tier)
-        hotel_context = "\n\n=== ACCOMMODATION OPTIONS ===\n"
-        for hotel in hotels:
-            hotel_context += f"\n• {hotel.name} ({hotel.area})\n"
-            hotel_context += f"  Price: ${hotel.price_per_night}/night\n"
-            hotel_context += f"  Rating: {hotel.rating}/5.0\n"
-            hotel_context += f"  Description: {hotel.description}\n"
-            hotel_context += f"  Booking: {hotel.booking_link}\n"
-        return {"hotel_recommendations": hotel_context}
+        return {"hotels": hotels, "hotel_recommendations": format_hotels(hotels)}
 
     # Perform web searches for hotel recommendations
     search_queries = [
@@ -37,34 +43,12 @@ async def hotel_node(state: TripState):
         f"where to stay in {spec.destination} {spec.travelers} travelers"
     ]
 
-    search_results = []
-    for query in search_queries:
-        try:
-            results = web_search_tool.invoke({"query": query, "max_results": 4})
-            search_results.extend(results)
-        except Exception as e:
-            print(f"Search error for '{query}': {e}")
+    search_results = await search_all(search_queries, max_results=4)
 
     # Format search results for LLM
-    search_context = "\n\n".join([
-        f"**{r['title']}**\n{r['snippet']}\nSource: {r['url']}"
-        for r in search_results[:12]
-    ])
-
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.3,
-        max_tokens=8000
-    )
-
-    prompt = ChatPromptTemplate.from_template(
-        HOTEL_SYSTEM_PROMPT + "\n\nWeb Search Results:\n{search_context}"
-    )
-    chain = prompt | llm
+    search_context = build_search_context(search_results, " ".join(search_queries), max_results=12)
 
-    response = await chain.ainvoke({
+    shortlist = await invoke_structured("hotel", {
         "destination": spec.destination,
         "dates": spec.dates,
         "budget_tier": spec.budget_tier,
@@ -74,6 +58,6 @@ async def hotel_node(state: TripState):
         "research_notes": research_notes,
         "weather_info": weather_info,
         "search_context": search_context
-    })
+    }, HotelShortlist)
 
-    return {"hotel_recommendations": response.content}
+    return {"hotels": shortlist.hotels, "hotel_recommendations": format_hotels(shortlist.hotels)}
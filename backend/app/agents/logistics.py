@@ -1,10 +1,25 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from app.graph.state import TripState
-from app.core.prompts import LOGISTICS_SYSTEM_PROMPT
-from app.tools.web_search import web_search_tool
-from app.tools.mocks import BookingMocks
-import os
+from app.core.llm import invoke_structured
+from app.schemas.agents import LogisticsPlan
+from app.tools.web_search import search_all
+from app.tools.search_ranking import build_search_context
+from app.tools.mocks import BookingMocks, mock_latency, use_mock_data
+
+def format_logistics(plan: LogisticsPlan) -> str:
+    """Text rendering of the transport plan for agents that read prose context."""
+    logistics_context = "\n\n=== TRANSPORTATION PLAN ===\n"
+    logistics_context += "\n🛫 TRAVEL OPTIONS:\n"
+    for option in plan.options:
+        logistics_context += f"  • {option.provider} ({option.type}): {option.departure} → {option.arrival}\n"
+        logistics_context += f"    Price: ${option.estimated_price}\n"
+        if option.booking_link:
+            logistics_context += f"    Booking: {option.booking_link}\n"
+
+    if plan.notes:
+        logistics_context += "\n🚇 LOCAL TRANSPORT & TIPS:\n"
+        for note in plan.notes:
+            logistics_context += f"  • {note}\n"
+    return logistics_context
 
 async def logistics_node(state: TripState):
     """
@@ -27,33 +42,22 @@ async def logistics_node(state: TripState):
         end_date = (today + datetime.timedelta(days=3)).strftime("%Y-%m-%d")
 
     # Check for API key to decide execution mode
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-    if not project:
+    if use_mock_data():
+        await mock_latency("search", "llm")
         # Use mock flight data
         flights = BookingMocks.search_flights(spec.origin, spec.destination, start_date)
         return_flights = BookingMocks.search_flights(spec.destination, spec.origin, end_date)
 
-        logistics_context = "\n\n=== TRANSPORTATION PLAN ===\n"
-        logistics_context += "\n🛫 OUTBOUND FLIGHTS:\n"
-        for flight in flights:
-            logistics_context += f"  • {flight.provider}: {flight.departure} → {flight.arrival}\n"
-            logistics_context += f"    Price: ${flight.estimated_price}\n"
-            logistics_context += f"    Booking: {flight.booking_link}\n"
-
-        logistics_context += "\n🛬 RETURN FLIGHTS:\n"
-        for flight in return_flights:
-            logistics_context += f"  • {flight.provider}: {flight.departure} → {flight.arrival}\n"
-            logistics_context += f"    Price: ${flight.estimated_price}\n"
-            logistics_context += f"    Booking: {flight.booking_link}\n"
-
-        logistics_context += "\n🚇 LOCAL TRANSPORT:\n"
-        logistics_context += f"  • Public transit (subway/bus): Recommended for {spec.destination}\n"
-        logistics_context += f"  • Ride-sharing apps (Uber/Lyft): Available\n"
-        logistics_context += f"  • Bike rentals: Available in central areas\n"
-        logistics_context += f"  • Walking: Best for exploring local neighborhoods\n"
-
-        return {"logistics_info": logistics_context}
+        plan = LogisticsPlan(
+            options=flights + return_flights,
+            notes=[
+                f"Public transit (subway/bus): Recommended for {spec.destination}",
+                "Ride-sharing apps (Uber/Lyft): Available",
+                "Bike rentals: Available in central areas",
+                "Walking: Best for exploring local neighborhoods",
+            ]
+        )
+        return {"transport_options": plan.options, "logistics_info": format_logistics(plan)}
 
     # Perform web searches for transportation options
     search_queries = [
@@ -63,34 +67,12 @@ async def logistics_node(state: TripState):
         f"transportation tips {spec.destination} {spec.budget_tier} budget"
     ]
 
-    search_results = []
-    for query in search_queries:
-        try:
-            results = web_search_tool.invoke({"query": query, "max_results": 4})
-            search_results.extend(results)
-        except Exception as e:
-            print(f"Search error for '{query}': {e}")
+    search_results = await search_all(search_queries, max_results=4)
 
     # Format search results for LLM
-    search_context = "\n\n".join([
-        f"**{r['title']}**\n{r['snippet']}\nSource: {r['url']}"
-        for r in search_results[:12]
-    ])
-
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.3,
-        max_tokens=8000
-    )
-
-    prompt = ChatPromptTemplate.from_template(
-        LOGISTICS_SYSTEM_PROMPT + "\n\nWeb Search Results:\n{search_context}"
-    )
-    chain = prompt | llm
+    search_context = build_search_context(search_results, " ".join(search_queries), max_results=12)
 
-    response = await chain.ainvoke({
+    plan = await invoke_structured("logistics", {
         "origin": spec.origin,
         "destination": spec.destination,
         "dates": spec.dates,
@@ -102,6 +84,6 @@ async def logistics_node(state: TripState):
         "research_notes": research_notes,
         "weather_info": weather_info,
         "search_context": search_context
-    })
+    }, LogisticsPlan, cache=True)
 
-    return {"logistics_info": response.content}
+    return {"transport_options": plan.options, "logistics_info": format_logistics(plan)}
@@ -1,32 +1,111 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
-from langchain_core.output_parsers import JsonOutputParser
 from app.graph.state import TripState
-from app.schemas.itinerary import TripPlan
-from app.core.prompts import PLANNER_SYSTEM_PROMPT
-import os
+from app.schemas.itinerary import (
+    TripPlan, DailyPlan, AccommodationOption, TransportOption, BudgetBreakdown, PackingItem
+)
+from app.core.llm import PLANNER_OUTPUT_PARSER, invoke_chain, stream_chain
+from app.core.context_budget import budget_sections
+from app.core.json_stream import JsonStreamParser
+from app.core.metrics import NODE_ERRORS
+from app.tools.weather import WeatherTool
+from app.tools.mocks import mock_latency, use_mock_data
+from pydantic import ValidationError
 import json
+import os
+
+# Parse the planner's JSON as it streams and publish each day when it completes
+PLANNER_STREAMING = os.getenv("PLANNER_STREAMING", "true").lower() in ("1", "true", "yes")
+
+
+def _compact_json(items) -> str:
+    return json.dumps([item.model_dump(exclude_none=True) for item in items], separators=(",", ":"))
+
+
+def _day_writer():
+    """Custom stream writer for per-day events, or a no-op outside a streamed graph run."""
+    try:
+        from langgraph.config import get_stream_writer
+        return get_stream_writer()
+    except Exception:
+        return lambda _: None
+
+
+def _valid_items(model, raw_items) -> list:
+    """Validates each raw item against `model`, dropping the ones that don't fit."""
+    items = []
+    for raw in raw_items or []:
+        try:
+            items.append(model.model_validate(raw))
+        except ValidationError:
+            continue
+    return items
+
+
+def _parse_plan(content: str) -> TripPlan:
+    """The planner response as a TripPlan; raises on truncated or invalid output."""
+    return TripPlan(**PLANNER_OUTPUT_PARSER.parse(content))
+
+
+def _salvage_plan(data: dict, spec, hotels, transport, budget) -> TripPlan:
+    """Builds a TripPlan from a partial planner response, keeping every valid day."""
+    days = _valid_items(DailyPlan, data.get("itinerary"))
+    if not days:
+        raise ValueError("no complete itinerary days in the planner response")
+    if budget is None:
+        salvaged_budget = _valid_items(BudgetBreakdown, [data.get("budget")])
+        budget = salvaged_budget[0] if salvaged_budget else BudgetBreakdown(
+            flights=0, accommodation=0, activities=0, food=0, transport_local=0, total_estimated=0
+        )
+    return TripPlan(
+        title=data.get("title") or f"{spec.destination} Trip",
+        summary=data.get("summary") or "",
+        itinerary=days,
+        hotels_shortlist=hotels or _valid_items(AccommodationOption, data.get("hotels_shortlist")),
+        intercity_travel=transport or _valid_items(TransportOption, data.get("intercity_travel")),
+        budget=budget,
+        packing_list=_valid_items(PackingItem, data.get("packing_list")),
+    )
+
+
+async def _stream_plan(inputs: dict, weather_by_date: dict) -> str:
+    """
+    Streams the planner response and emits a "day" stream event as soon as
+    each DailyPlan in it is complete. Returns the full response text.
+    """
+    write = _day_writer()
+    parser = JsonStreamParser("itinerary")
+    async for chunk in stream_chain("planner", inputs, cache=True, validate=_parse_plan):
+        for raw in parser.feed(chunk):
+            try:
+                day = DailyPlan.model_validate(raw)
+            except ValidationError:
+                continue
+            if day.weather is None:
+                day.weather = weather_by_date.get(day.date)
+            write({"event": "day", "day": day.model_dump()})
+    return parser.text
+
 
 async def planner_node(state: TripState):
     spec = state['spec']
     research = state.get('research_notes', '')
-    weather = state.get('weather_info', 'Not checked')
-    hotels = state.get('hotel_recommendations', '')
-    budget = state.get('budget_breakdown', '')
-    logistics = state.get('logistics_info', '')
+    weather_data = state.get('weather_data') or []
+    weather_by_date = {day.date: day for day in weather_data}
+    # Compact per-day facts when structured weather is available
+    weather = WeatherTool.render_compact(weather_data) if weather_data else state.get('weather_info', 'Not checked')
+    typed_hotels = state.get('hotels') or []
+    typed_transport = state.get('transport_options') or []
+    typed_budget = state.get('budget')
+    # Typed agent outputs go to the planner as compact JSON; prose is the fallback
+    hotels = _compact_json(typed_hotels) if typed_hotels else state.get('hotel_recommendations', '')
+    budget = typed_budget.model_dump_json() if typed_budget else state.get('budget_breakdown', '')
+    logistics = _compact_json(typed_transport) if typed_transport else state.get('logistics_info', '')
     activities = state.get('activities_recommendations', '')
 
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-    parser = JsonOutputParser(pydantic_object=TripPlan)
-
-    if not project:
+    if use_mock_data():
+        await mock_latency("llm")
         # Mock Response for testing without LLM
         from datetime import datetime, timedelta
-        from app.schemas.itinerary import (
-            DailyPlan, Activity, AccommodationOption,
-            TransportOption, BudgetBreakdown, PackingItem, WeatherData
-        )
+        from app.schemas.itinerary import Activity, WeatherData
 
         # Parse dates
         try:
@@ -46,7 +125,7 @@ async def planner_node(state: TripState):
                 day_number=i + 1,
                 date=day_date.strftime("%Y-%m-%d"),
                 city=spec.destination,
-                weather=WeatherData(
+                weather=weather_by_date.get(day_date.strftime("%Y-%m-%d")) or WeatherData(
                     date=day_date.strftime("%Y-%m-%d"),
                     temperature_c=20.0,
                     condition="Partly cloudy",
@@ -83,7 +162,7 @@ async def planner_node(state: TripState):
             ))
 
         # Mock hotels
-        hotels_list = [
+        hotels_list = typed_hotels or [
             AccommodationOption(
                 name=f"Mock Hotel {spec.destination}",
                 area="City Center",
@@ -95,7 +174,7 @@ async def planner_node(state: TripState):
         ]
 
         # Mock budget
-        budget_obj = BudgetBreakdown(
+        budget_obj = typed_budget or BudgetBreakdown(
             flights=600,
             accommodation=100 * num_days,
             activities=50 * num_days,
@@ -117,40 +196,65 @@ async def planner_node(state: TripState):
             summary=f"A {num_days}-day {spec.travel_style} adventure in {spec.destination} for {spec.travelers} traveler(s) with {spec.budget_tier} budget.",
             itinerary=itinerary,
             hotels_shortlist=hotels_list,
-            intercity_travel=[],
+            intercity_travel=typed_transport,
             budget=budget_obj,
             packing_list=packing_list
         )
 
-        return {"plan": mock_plan, "status": "completed", "plan_quality_score": 7}
+        write = _day_writer()
+        for day in itinerary:
+            write({"event": "day", "day": day.model_dump()})
 
-    # Use Gemini 2.0 Flash for better planning
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.2,
-        max_tokens=8000
-    )
-
-    prompt = ChatPromptTemplate.from_template(PLANNER_SYSTEM_PROMPT + "\n\n{format_instructions}")
+        return {"plan": mock_plan, "status": "completed", "plan_quality_score": 7}
 
-    chain = prompt | llm | parser
+    # Keep the upstream sections within the planner's context budget (PLANNER_CONTEXT_TOKENS)
+    context = budget_sections({
+        "research_notes": research,
+        "weather_info": weather,
+        "hotel_recommendations": hotels,
+        "budget_breakdown": budget,
+        "logistics_info": logistics,
+        "activities_recommendations": activities
+    })
 
     try:
-        result = await chain.ainvoke({
+        # Shared Gemini client and planner prompt (format instructions baked in).
+        # Identical rendered prompts are answered from the persistent LLM cache.
+        inputs = {
             "budget_tier": spec.budget_tier,
             "travel_style": spec.travel_style,
-            "research_notes": research,
-            "weather_info": weather,
-            "hotel_recommendations": hotels,
-            "budget_breakdown": budget,
-            "logistics_info": logistics,
-            "activities_recommendations": activities,
-            "format_instructions": parser.get_format_instructions()
-        })
-        # Result is a dict, we cast to TripPlan model
-        plan = TripPlan(**result)
+            **context
+        }
+        if PLANNER_STREAMING:
+            content = await _stream_plan(inputs, weather_by_date)
+        else:
+            content = await invoke_chain("planner", inputs, cache=True, validate=_parse_plan)
+
+        salvaged = False
+        try:
+            plan = _parse_plan(content)
+        except (ValueError, TypeError):
+            # Truncated or malformed response: keep the days that did arrive intact
+            parser = JsonStreamParser("itinerary")
+            parser.feed(content)
+            data = parser.salvage()
+            if data is None:
+                raise
+            plan = _salvage_plan(data, spec, typed_hotels, typed_transport, typed_budget)
+            salvaged = True
+
+        # Use the real forecast for any day the model left without weather
+        for day in plan.itinerary:
+            if day.weather is None and day.date in weather_by_date:
+                day.weather = weather_by_date[day.date]
+
+        # Prefer the agents' typed outputs over the model re-typing them
+        if typed_budget is not None:
+            plan.budget = typed_budget
+        if not plan.hotels_shortlist:
+            plan.hotels_shortlist = typed_hotels
+        if not plan.intercity_travel:
+            plan.intercity_travel = typed_transport
 
         # Evaluate plan quality (simple heuristic for now)
         quality_score = 8  # Default good score
@@ -160,7 +264,11 @@ async def planner_node(state: TripState):
             quality_score = min(quality_score, 5)
         if plan.budget.total_estimated <= 0:
             quality_score = min(quality_score, 4)
+        if salvaged:
+            # Usable but incomplete; not worth re-running the hotel loop over
+            quality_score = min(quality_score, 6)
 
         return {"plan": plan, "status": "completed", "plan_quality_score": quality_score}
     except Exception as e:
+        NODE_ERRORS.inc(node="planner")
         return {"messages": [f"Error generating plan: {str(e)}"], "status": "failed", "plan_quality_score": 0}
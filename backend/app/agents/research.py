@@ -1,21 +1,18 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_google_vertexai import ChatVertexAI
 from app.graph.state import TripState
-from app.core.prompts import RESEARCHER_SYSTEM_PROMPT
-from app.tools.web_search import web_search_tool
-import os
+from app.core.llm import invoke_chain
+from app.tools.web_search import search_all
+from app.tools.search_ranking import build_search_context
+from app.tools.mocks import mock_latency, use_mock_data
 
 async def research_node(state: TripState):
     spec = state['spec']
 
     # Check for Vertex AI configuration
-    project = os.getenv("GOOGLE_CLOUD_PROJECT")
-    location = os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
-
-    if not project:
+    if use_mock_data():
+        await mock_latency("search", "llm")
         return {"research_notes": "Simulation: The user likes museums and spicy food. Recommended: Grand Museum, Spicy Noodle House."}
 
-    # Perform web searches for real-time data
+    # Perform web searches for real-time data (concurrently, off the event loop)
     search_queries = [
         f"best things to do in {spec.destination} {' '.join(spec.interests)}",
         f"top restaurants {spec.destination} {spec.budget_tier} budget",
@@ -23,38 +20,16 @@ async def research_node(state: TripState):
         f"{spec.destination} travel guide 2026"
     ]
 
-    search_results = []
-    for query in search_queries:
-        try:
-            results = web_search_tool.invoke({"query": query, "max_results": 4})
-            search_results.extend(results)
-        except Exception as e:
-            print(f"Search error for '{query}': {e}")
-
-    # Format search results for LLM
-    search_context = "\n\n".join([
-        f"**{r['title']}**\n{r['snippet']}\nSource: {r['url']}"
-        for r in search_results[:15]  # Limit to top 15 results
-    ])
-
-    llm = ChatVertexAI(
-        model="gemini-2.5-flash",
-        project=project,
-        location=location,
-        temperature=0.7,
-        max_tokens=8000
-    )
+    search_results = await search_all(search_queries, max_results=4)
 
-    prompt = ChatPromptTemplate.from_template(
-        RESEARCHER_SYSTEM_PROMPT + "\n\nWeb Search Results:\n{search_context}"
-    )
-    chain = prompt | llm
+    # Most relevant unique results, within the search context token budget
+    search_context = build_search_context(search_results, " ".join(search_queries + spec.interests), max_results=15)
 
-    response = await chain.ainvoke({
+    content = await invoke_chain("research", {
         "destination": spec.destination,
         "interests": ", ".join(spec.interests) if spec.interests else "general sightseeing",
         "budget_tier": spec.budget_tier,
         "search_context": search_context
     })
 
-    return {"research_notes": response.content}
+    return {"research_notes": content}
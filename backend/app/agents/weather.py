@@ -1,5 +1,6 @@
 from app.graph.state import TripState
-from app.tools.weather import WeatherTool
+from app.tools.weather import WeatherTool, weather_client
+from app.tools import mocks
 import datetime
 
 async def weather_node(state: TripState):
@@ -11,7 +12,14 @@ async def weather_node(state: TripState):
 
     # Get coordinates for the destination city
     city = spec.destination
-    lat, lon = WeatherTool.get_city_coordinates(city)
+    coords = WeatherTool.get_city_coordinates(city)
+    if coords is None:
+        # Better no forecast than a forecast for the wrong place
+        return {
+            "weather_info": f"\n=== WEATHER FORECAST UNAVAILABLE ===\nCould not locate '{city}' in the gazetteer.\n",
+            "weather_data": []
+        }
+    lat, lon = coords
 
     # Parse dates
     # Assuming 'YYYY-MM-DD to YYYY-MM-DD' format
@@ -24,8 +32,16 @@ async def weather_node(state: TripState):
         start = datetime.date.today().strftime("%Y-%m-%d")
         end = (datetime.date.today() + datetime.timedelta(days=3)).strftime("%Y-%m-%d")
 
-    # Fetch weather forecast
-    tool = WeatherTool()
-    info = tool.get_forecast(lat, lon, start, end)
+    # Fetch weather forecast (shared client, cached, off the event loop)
+    try:
+        if mocks.MOCK_WEATHER or mocks.in_fallback():
+            await mocks.mock_latency("weather")
+            days = mocks.WeatherMocks.daily(start, end)
+        else:
+            days = await weather_client.get_daily(lat, lon, start, end)
+    except Exception as e:
+        return {"weather_info": WeatherTool.unavailable_message(lat, lon, e), "weather_data": []}
 
-    return {"weather_info": info}
+    # Structured records for the planner, rendered text for the other agents
+    info = WeatherTool.render_forecast(days, lat, lon, start, end)
+    return {"weather_info": info, "weather_data": days}
@@ -0,0 +1,274 @@
+"""
+Background execution of trip-planning graph runs.
+
+POST /plan submits a job and returns immediately; the graph runs on the event
+loop behind a semaphore so each worker caps how many plans execute at once.
+Clients poll GET /trips/{run_id} for status and the current node, or follow
+GET /plan/{run_id}/events for a live feed of each node's output and of each
+itinerary day as the planner streams it.
+
+Identical specs submitted while a run for them is still in flight are
+coalesced: the newcomer gets its own run_id but follows the existing run
+instead of executing the graph again.
+
+Jobs, coalescing and event feeds live in this worker's memory. Completed plans
+are also in the trip store, so any worker can serve them, but status and
+events of a run still in progress are only known to the worker running it:
+deploy with one worker, or route a run's requests to the same worker.
+"""
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi.encoders import jsonable_encoder
+
+from app.core.spec_key import spec_key
+from app.graph.state import initial_state
+from app.schemas.itinerary import TripPlan
+from app.schemas.requests import TripSpec
+
+MAX_CONCURRENT_RUNS = int(os.getenv("MAX_CONCURRENT_RUNS", "4"))
+MAX_QUEUED_RUNS = int(os.getenv("MAX_QUEUED_RUNS", "100"))
+# Finished jobs are forgotten after this long; completed plans live on in the trip store
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+# Attach identical concurrent requests to the run already in flight
+COALESCE_RUNS = os.getenv("COALESCE_RUNS", "true").lower() in ("1", "true", "yes")
+
+
+class QueueFullError(Exception):
+    """Raised when a worker already has MAX_QUEUED_RUNS jobs waiting (followers included)."""
+
+
+@dataclass
+class PlanJob:
+    run_id: str
+    spec: TripSpec
+    status: str = "queued"  # queued | running | completed | failed
+    current_node: Optional[str] = None  # graph node that most recently reported
+    completed_nodes: List[str] = field(default_factory=list)
+    plan: Optional[TripPlan] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    # run_id of the in-flight run this job follows instead of running the graph itself
+    coalesced_with: Optional[str] = None
+    cached: bool = False  # plan served from the plan cache
+    # Sections whose agent missed its deadline and served mock output
+    degraded_sections: List[str] = field(default_factory=list)
+    finished: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Progress events (already JSON-encodable) kept so late subscribers can replay them
+    events: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    _new_event: asyncio.Condition = field(default_factory=asyncio.Condition, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("completed", "failed")
+
+    async def publish(self, event: str, data: Dict[str, Any]) -> None:
+        self.events.append({"event": event, "data": jsonable_encoder(data)})
+        async with self._new_event:
+            self._new_event.notify_all()
+
+    async def stream(self) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Yields every progress event for this run, starting from the first, and
+        returns after the final "done" event.
+        """
+        index = 0
+        while True:
+            while index < len(self.events):
+                event = self.events[index]
+                index += 1
+                yield event
+                if event["event"] == "done":
+                    return
+            async with self._new_event:
+                await self._new_event.wait_for(lambda seen=index: seen < len(self.events))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "run_id": self.run_id,
+            "status": self.status,
+            "current_node": self.current_node,
+            "completed_nodes": self.completed_nodes,
+            "plan": self.plan,
+            "error": self.error,
+            "coalesced_with": self.coalesced_with,
+            "cached": self.cached,
+            "degraded_sections": self.degraded_sections,
+        }
+
+
+class JobManager:
+    """
+    Tracks plan jobs for this worker and runs them with bounded concurrency.
+    """
+
+    def __init__(self, graph, max_concurrent_runs: int = MAX_CONCURRENT_RUNS,
+                 max_queued_runs: int = MAX_QUEUED_RUNS, retention_seconds: float = JOB_RETENTION_SECONDS,
+                 on_complete=None, lookup=None, coalesce: bool = COALESCE_RUNS):
+        self.graph = graph
+        self.max_queued_runs = max_queued_runs
+        self.retention_seconds = retention_seconds
+        # Optional async callback(job) invoked once a plan has been produced
+        self.on_complete = on_complete
+        # Optional async callback(spec) returning an already-computed TripPlan, or None
+        self.lookup = lookup
+        self.coalesce = coalesce
+        self._semaphore = asyncio.Semaphore(max_concurrent_runs)
+        self._jobs: Dict[str, PlanJob] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # spec_key -> the job actually executing the graph for that spec
+        self._inflight: Dict[str, PlanJob] = {}
+
+    async def submit(self, spec: TripSpec) -> PlanJob:
+        """
+        Registers a run for `spec`. Returns a completed job straight away when
+        `lookup` has a plan for it; otherwise the graph runs in the background.
+        """
+        self._prune()
+        if self.lookup is not None:
+            try:
+                plan = await self.lookup(spec)
+            except Exception as e:
+                # A cache problem shouldn't fail the request; plan it from scratch
+                print(f"Plan lookup failed: {e}")
+                plan = None
+            if plan is not None:
+                return await self._complete_from_cache(spec, plan)
+
+        # Followers hold a task, an event log and a subscriber each, so they count too
+        queued = sum(1 for job in self._jobs.values()
+                     if job.status == "queued" or (job.coalesced_with is not None and not job.done))
+        if queued >= self.max_queued_runs:
+            raise QueueFullError(f"{queued} plan runs already queued")
+
+        key = spec_key(spec) if self.coalesce else None
+        leader = self._inflight.get(key) if key else None
+        if leader is not None and not leader.done:
+            job = PlanJob(run_id=str(uuid.uuid4()), spec=spec, coalesced_with=leader.run_id)
+            self._jobs[job.run_id] = job
+            self._start(self._follow(job, leader))
+            return job
+
+        job = PlanJob(run_id=str(uuid.uuid4()), spec=spec)
+        self._jobs[job.run_id] = job
+        if key:
+            self._inflight[key] = job
+        self._start(self._run(job, key))
+        return job
+
+    async def _complete_from_cache(self, spec: TripSpec, plan: TripPlan) -> PlanJob:
+        job = PlanJob(run_id=str(uuid.uuid4()), spec=spec, status="completed", plan=plan, cached=True)
+        self._jobs[job.run_id] = job
+        await self._notify_complete(job)
+        job.finished_at = time.time()
+        job.finished.set()
+        await job.publish("done", job.to_dict())
+        return job
+
+    async def _notify_complete(self, job: PlanJob) -> None:
+        """
+        Runs `on_complete` for a job that already holds its plan. A failure
+        there (persistence, plan cache) is logged; the plan is still returned.
+        """
+        if self.on_complete is None:
+            return
+        try:
+            await self.on_complete(job)
+        except Exception as e:
+            print(f"on_complete failed for {job.run_id}: {e!r}")
+
+    def _start(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        # Hold a reference so the task isn't garbage collected mid-run
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def get(self, run_id: str) -> Optional[PlanJob]:
+        return self._jobs.get(run_id)
+
+    def jobs(self) -> List[PlanJob]:
+        return list(self._jobs.values())
+
+    async def wait(self, job: PlanJob) -> PlanJob:
+        """Waits for a job to finish (used by the synchronous ?wait=true mode)."""
+        await job.finished.wait()
+        return job
+
+    async def _run(self, job: PlanJob, key: Optional[str] = None) -> None:
+        async with self._semaphore:
+            job.status = "running"
+            await job.publish("status", {"run_id": job.run_id, "status": job.status})
+            try:
+                stream = self.graph.astream(initial_state(job.spec), stream_mode=["updates", "custom"])
+                async for mode, chunk in stream:
+                    if mode == "custom":
+                        # Nodes' own progress events, e.g. each planner day as it's parsed
+                        if isinstance(chunk, dict) and "event" in chunk:
+                            data = {k: v for k, v in chunk.items() if k != "event"}
+                            await job.publish(chunk["event"], data)
+                        continue
+                    for node, update in chunk.items():
+                        job.current_node = node
+                        job.completed_nodes.append(node)
+                        if update and update.get("plan") is not None:
+                            job.plan = update["plan"]
+                        for section in (update or {}).get("degraded_sections", []):
+                            if section not in job.degraded_sections:
+                                job.degraded_sections.append(section)
+                        await job.publish("node", {"node": node, "update": update or {}})
+
+                if job.plan is not None:
+                    job.status = "completed"
+                    await self._notify_complete(job)
+                else:
+                    job.status = "failed"
+                    job.error = "No plan generated"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                if key and self._inflight.get(key) is job:
+                    del self._inflight[key]
+                job.finished_at = time.time()
+                job.finished.set()
+                await job.publish("done", job.to_dict())
+
+    async def _follow(self, job: PlanJob, leader: PlanJob) -> None:
+        """Mirrors a coalesced job's progress and result from the run it follows."""
+        try:
+            async for event in leader.stream():
+                name, data = event["event"], event["data"]
+                if name == "done":
+                    break
+                if name == "status":
+                    job.status = "running"
+                    data = {**data, "run_id": job.run_id}
+                elif name == "node":
+                    job.current_node = data["node"]
+                    job.completed_nodes.append(data["node"])
+                await job.publish(name, data)
+
+            job.plan = leader.plan
+            job.error = leader.error
+            job.degraded_sections = list(leader.degraded_sections)
+            job.status = leader.status
+            if job.status == "completed":
+                await self._notify_complete(job)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.finished.set()
+            await job.publish("done", job.to_dict())
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        # A job can be done but not yet finished while on_complete runs
+        for run_id in [r for r, j in self._jobs.items() if j.finished_at is not None and j.finished_at < cutoff]:
+            del self._jobs[run_id]
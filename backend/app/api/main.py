@@ -1,10 +1,17 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from app.schemas.requests import TripSpec
-from app.schemas.itinerary import TripPlan
 from app.graph.graph import build_graph
-import uuid 
-import asyncio
+from app.core.llm_cache import llm_response_cache
+from app.core import metrics
+from app.tools.web_search import search_cache
+from app.api.jobs import JobManager, PlanJob, QueueFullError
+from app.db import trips as trip_store
+from app.db import plan_cache
+from app.db.database import create_db_and_tables
+import json
 
 app = FastAPI(title="AI Travel Planner")
 
@@ -17,54 +24,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory store for MVP
-trips_db = {}
-
 graph_app = build_graph()
 
+
+async def store_completed_trip(job: PlanJob):
+    await trip_store.asave_trip(job.run_id, job.spec.destination, job.plan)
+    # Degraded plans carry mock sections, so the next identical request should retry
+    if not job.cached and not job.degraded_sections:
+        try:
+            await plan_cache.acache_plan(job.spec, job.plan)
+        except Exception as e:
+            print(f"Failed to cache plan for {job.run_id}: {e}")
+
+
+jobs = JobManager(graph_app, on_complete=store_completed_trip, lookup=plan_cache.aget_cached_plan)
+
+# Point-in-time values read when /metrics is scraped
+metrics.registry.gauge("travel_plan_runs_queued", "Plan runs waiting for a slot",
+                       lambda: sum(1 for job in jobs.jobs() if job.status == "queued"))
+metrics.registry.gauge("travel_plan_runs_running", "Plan runs executing the graph",
+                       lambda: sum(1 for job in jobs.jobs() if job.status == "running"))
+metrics.registry.gauge("travel_search_cache_hits", "Search cache hits since start",
+                       lambda: search_cache.stats()["hits"])
+metrics.registry.gauge("travel_search_cache_misses", "Search cache misses since start",
+                       lambda: search_cache.stats()["misses"])
+metrics.registry.gauge("travel_search_cache_entries", "Entries in the search cache",
+                       lambda: search_cache.stats()["entries"])
+metrics.registry.gauge("travel_llm_cache_hits", "LLM response cache hits since start",
+                       lambda: llm_response_cache.stats()["hits"])
+metrics.registry.gauge("travel_llm_cache_misses", "LLM response cache misses since start",
+                       lambda: llm_response_cache.stats()["misses"])
+
+@app.on_event("startup")
+def init_trip_store():
+    create_db_and_tables()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
-@app.post("/plan")
-async def create_plan(spec: TripSpec):
-    run_id = str(uuid.uuid4())
-    
-    # Initialize state
-    inputs = {
-        "spec": spec,
-        "revision_count": 0,
-        "research_notes": "",
-        "weather_info": "",
-        "hotel_recommendations": "",
-        "budget_breakdown": "",
-        "logistics_info": "",
-        "activities_recommendations": "",
-        "plan_quality_score": 0,
-        "messages": []
-    }
-    
-    # Run graph
-    # In production, use background tasks or a queue (Celery/Redis)
-    # For MVP, we await it (might timeout on Vercel, but okay for local)
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition: per-node latency/errors, LLM tokens, search and cache counters."""
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/plan", status_code=202)
+async def create_plan(spec: TripSpec, response: Response, wait: bool = False):
+    """
+    Queues a plan run and returns its run_id immediately. Poll
+    GET /trips/{run_id} for progress. Pass ?wait=true to block until the
+    plan is finished (the original synchronous behaviour). A spec identical
+    to one already being planned gets its own run_id but shares that run
+    (reported as `coalesced_with`). A spec with a cached plan is answered
+    immediately with the plan unless `force_refresh` is set. Agents that
+    overran their deadline are listed in `degraded_sections`.
+    """
     try:
-        result = await graph_app.ainvoke(inputs)
-        plan = result.get("plan")
-        if plan:
-            trips_db[run_id] = plan
-            return {"run_id": run_id, "status": "completed", "plan": plan}
-        else:
-             return {"run_id": run_id, "status": "failed", "error": "No plan generated"}
-            
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        job = await jobs.submit(spec)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e)) from e
+
+    if not wait and not job.done:
+        return {"run_id": job.run_id, "status": job.status}
+
+    await jobs.wait(job)
+    response.status_code = 200
+    if job.status == "completed":
+        return {"run_id": job.run_id, "status": "completed", "plan": job.plan, "cached": job.cached,
+                "degraded_sections": job.degraded_sections}
+    return {"run_id": job.run_id, "status": "failed", "error": job.error}
+
+async def _single_event(event: str, data: dict):
+    yield {"event": event, "data": data}
+
+@app.get("/plan/{run_id}/events")
+async def stream_plan_events(run_id: str):
+    """
+    Server-Sent Events feed for a run: a "status" event when it starts, one
+    "node" event per finished graph node with that node's output (research
+    notes, weather, hotels, ...), a "day" event per itinerary day as soon as
+    the planner has produced it, and a final "done" event with the plan.
+    Events already emitted are replayed to late subscribers. A finished run
+    this worker doesn't know (another worker ran it) gets just the "done"
+    event from the trip store.
+    """
+    job = jobs.get(run_id)
+    if job is not None:
+        events = job.stream()
+    else:
+        plan = await trip_store.aget_trip(run_id)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        done = {"run_id": run_id, "status": "completed", "current_node": None, "plan": plan, "error": None}
+        events = _single_event("done", jsonable_encoder(done))
+
+    async def event_stream():
+        async for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/trips/{run_id}")
-def get_trip(run_id: str):
-    if run_id not in trips_db:
+async def get_trip(run_id: str):
+    job = jobs.get(run_id)
+    if job is not None:
+        return job.to_dict()
+    plan = await trip_store.aget_trip(run_id)
+    if plan is None:
         raise HTTPException(status_code=404, detail="Trip not found")
-    return trips_db[run_id]
+    return {"run_id": run_id, "status": "completed", "current_node": None, "plan": plan, "error": None}
 
 @app.get("/trips")
-def list_trips():
-    return [{"id": k, "destination": v.itinerary[0].city if v.itinerary else "Unknown"} for k,v in trips_db.items()]
+async def list_trips(limit: int = 50, offset: int = 0):
+    return await trip_store.alist_trips(limit=min(limit, 200), offset=offset)
@@ -0,0 +1,124 @@
+"""
+Record/replay cassettes for Vertex AI responses and DuckDuckGo results.
+
+CASSETTE_MODE selects the behaviour, much like GOOGLE_CLOUD_PROJECT selects
+the mock path:
+
+- off (default): live calls only.
+- record: live calls; every LLM response (with its token usage) and search
+  result is also written to CASSETTE_DIR along with its measured latency.
+- replay: no network at all. Agents take their real code paths (prompt
+  rendering, JSON parsing, salvage, ...) and get recorded responses back after
+  a production-like delay: the recorded latency (or a fixed override) times
+  CASSETTE_LATENCY_SCALE, with +/- CASSETTE_JITTER random variation.
+
+Each interaction is one JSON file at <dir>/<kind>/<group>/<sha256>.json, where
+the group is the agent chain (LLM) or "ddg" (search) and the hash covers the
+fully rendered request. On a replay miss the exact request was never
+recorded; unless CASSETTE_STRICT is set, a recording from the same group is
+replayed instead (chosen deterministically from the request hash), so load
+tests can use specs that were never recorded.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()  # off | record | replay
+CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+CASSETTE_STRICT = os.getenv("CASSETTE_STRICT", "false").lower() in ("1", "true", "yes")
+CASSETTE_LATENCY_SCALE = float(os.getenv("CASSETTE_LATENCY_SCALE", "1.0"))
+CASSETTE_JITTER = float(os.getenv("CASSETTE_JITTER", "0.2"))
+# Fixed replay latencies in ms; unset means "as recorded"
+CASSETTE_LLM_LATENCY_MS = os.getenv("CASSETTE_LLM_LATENCY_MS")
+CASSETTE_SEARCH_LATENCY_MS = os.getenv("CASSETTE_SEARCH_LATENCY_MS")
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when nothing was recorded for a request."""
+
+
+def recording() -> bool:
+    return CASSETTE_MODE == "record"
+
+
+def replaying() -> bool:
+    return CASSETTE_MODE == "replay"
+
+
+class Cassette:
+    """One kind of recorded interaction ("llm" or "search")."""
+
+    def __init__(self, root: str, kind: str, latency_ms: Optional[str] = None):
+        self.path = os.path.join(root, kind)
+        self.latency_ms = float(latency_ms) if latency_ms else None
+        self._groups: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def request_key(request: str) -> str:
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _group_keys(self, group: str) -> List[str]:
+        with self._lock:
+            keys = self._groups.get(group)
+            if keys is None:
+                directory = os.path.join(self.path, group)
+                names = os.listdir(directory) if os.path.isdir(directory) else []
+                keys = self._groups[group] = sorted(n[:-5] for n in names if n.endswith(".json"))
+            return keys
+
+    def _read(self, group: str, key: str) -> Dict[str, Any]:
+        with open(os.path.join(self.path, group, key + ".json"), encoding="utf-8") as f:
+            return json.load(f)
+
+    def record(self, group: str, request: str, response: Any, latency_ms: float, **extra: Any) -> None:
+        key = self.request_key(request)
+        directory = os.path.join(self.path, group)
+        os.makedirs(directory, exist_ok=True)
+        entry = {"request": request, "response": response, "latency_ms": round(latency_ms, 1), **extra}
+        tmp = os.path.join(directory, f".{key}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, os.path.join(directory, key + ".json"))
+        with self._lock:
+            keys = self._groups.get(group)
+            if keys is not None and key not in keys:
+                keys.append(key)
+                keys.sort()
+
+    def lookup(self, group: str, request: str) -> Dict[str, Any]:
+        key = self.request_key(request)
+        keys = self._group_keys(group)
+        if key in keys:
+            return self._read(group, key)
+        if CASSETTE_STRICT or not keys:
+            raise CassetteMiss(f"No {os.path.basename(self.path)} cassette for '{group}' request {key[:12]}")
+        return self._read(group, keys[int(key, 16) % len(keys)])
+
+    def delay_seconds(self, entry: Dict[str, Any]) -> float:
+        base = self.latency_ms if self.latency_ms is not None else float(entry.get("latency_ms", 0))
+        jitter = random.uniform(1 - CASSETTE_JITTER, 1 + CASSETTE_JITTER) if CASSETTE_JITTER else 1.0
+        return max(0.0, base * CASSETTE_LATENCY_SCALE * jitter / 1000)
+
+    def replay(self, group: str, request: str) -> Dict[str, Any]:
+        """Blocking replay: looks the request up and sleeps for its latency."""
+        entry = self.lookup(group, request)
+        time.sleep(self.delay_seconds(entry))
+        return entry
+
+    async def areplay(self, group: str, request: str) -> Dict[str, Any]:
+        entry = await asyncio.to_thread(self.lookup, group, request)
+        await asyncio.sleep(self.delay_seconds(entry))
+        return entry
+
+    async def arecord(self, group: str, request: str, response: Any, latency_ms: float, **extra: Any) -> None:
+        await asyncio.to_thread(self.record, group, request, response, latency_ms, **extra)
+
+
+llm_cassette = Cassette(CASSETTE_DIR, "llm", CASSETTE_LLM_LATENCY_MS)
+search_cassette = Cassette(CASSETTE_DIR, "search", CASSETTE_SEARCH_LATENCY_MS)
@@ -0,0 +1,121 @@
+"""
+Token budgeting for large multi-section prompts (the planner).
+
+Each upstream agent can hand the planner thousands of tokens of prose. Before
+the planner call, every section is measured and, if the total is over budget,
+sections are compressed extractively: duplicate lines are dropped and the
+most informative lines (headings, prices, links, numbers) are kept in their
+original order until the section fits its share of the budget. Sections that
+are JSON (the typed hotel, transport and budget outputs) lose trailing array
+items instead, so they stay valid JSON.
+"""
+import json
+import math
+import os
+import re
+from typing import Dict
+
+PLANNER_CONTEXT_TOKENS = int(os.getenv("PLANNER_CONTEXT_TOKENS", "6000"))
+
+# Gemini tokenizes English prose at roughly four characters per token
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _line_score(line: str) -> float:
+    stripped = line.strip()
+    score = 1.0
+    if stripped.startswith(("#", "===", "**")) or stripped.endswith(":"):
+        score += 3  # headings give the planner structure
+    if re.search(r"[$€£¥]\s?\d|\d+\s?(usd|eur|per night|/night)", stripped, re.I):
+        score += 3  # prices
+    if "http" in stripped:
+        score += 2  # booking links
+    if re.search(r"\d", stripped):
+        score += 1  # dates, ratings, times
+    # Very long lines cost a lot for what they add
+    return score / max(1.0, estimate_tokens(stripped) / 40)
+
+
+def _compress_json(data, max_tokens: int) -> str:
+    """Drops trailing items (or members of an object) until the compact JSON fits."""
+    items = list(data.items()) if isinstance(data, dict) else list(data)
+    wrap = dict if isinstance(data, dict) else list
+    while True:
+        text = json.dumps(wrap(items), separators=(",", ":"))
+        if not items or estimate_tokens(text) <= max_tokens:
+            return text
+        items.pop()
+
+
+def compress_section(text: str, max_tokens: int) -> str:
+    """Extractively shrinks `text` to roughly `max_tokens` tokens."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    if text.lstrip().startswith(("[", "{")):
+        try:
+            data = json.loads(text)
+        except ValueError:
+            data = None
+        if isinstance(data, (list, dict)):
+            return _compress_json(data, max_tokens)
+
+    lines = []
+    seen = set()
+    for line in text.splitlines():
+        key = re.sub(r"\W+", " ", line.lower()).strip()
+        if not key or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line.rstrip())
+
+    ranked = sorted(range(len(lines)), key=lambda i: _line_score(lines[i]), reverse=True)
+    keep = set()
+    used = 0
+    for i in ranked:
+        cost = estimate_tokens(lines[i]) + 1
+        if used + cost > max_tokens:
+            continue
+        keep.add(i)
+        used += cost
+
+    if not keep and lines:
+        # Not even one line fits: hard-truncate the best one at a word boundary
+        best = lines[ranked[0]]
+        return best[: max_tokens * CHARS_PER_TOKEN].rsplit(" ", 1)[0] + " …"
+    return "\n".join(lines[i] for i in sorted(keep))
+
+
+def allocate_budget(sizes: Dict[str, int], total_tokens: int) -> Dict[str, int]:
+    """
+    Splits `total_tokens` across sections. Sections smaller than their fair
+    share keep their full size and the surplus goes to the larger ones.
+    """
+    allocation: Dict[str, int] = {}
+    remaining = total_tokens
+    pending = sorted(sizes.items(), key=lambda item: item[1])
+    while pending:
+        share = remaining // len(pending)
+        name, size = pending[0]
+        if size <= share:
+            allocation[name] = size
+            remaining -= size
+            pending.pop(0)
+            continue
+        for name, _ in pending:
+            allocation[name] = share
+        break
+    return allocation
+
+
+def budget_sections(sections: Dict[str, str], total_tokens: int = PLANNER_CONTEXT_TOKENS) -> Dict[str, str]:
+    """Returns `sections` with each value compressed to fit its share of `total_tokens`."""
+    sizes = {name: estimate_tokens(text) for name, text in sections.items()}
+    if sum(sizes.values()) <= total_tokens:
+        return dict(sections)
+    allocation = allocate_budget(sizes, total_tokens)
+    return {name: compress_section(text, allocation[name]) for name, text in sections.items()}
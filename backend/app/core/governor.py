@@ -0,0 +1,206 @@
+"""
+Process-wide governor for Vertex AI calls.
+
+Every LLM call from every concurrent plan run passes through one governor,
+which combines:
+
+- token buckets on requests per minute and tokens per minute. A call
+  reserves its prompt size plus an expected output up front; the reservation
+  is reconciled with Vertex's reported usage afterwards.
+- AIMD concurrency: the in-flight limit grows by one per limit-many successes
+  and halves on every 429 / RESOURCE_EXHAUSTED.
+- priority: waiting calls are admitted lowest priority value first, so the
+  planner of a nearly finished run goes ahead of research for a new one.
+
+Rate-limited calls are retried with exponential backoff before the error is
+allowed to surface.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, TypeVar
+
+from app.core import metrics
+
+VERTEX_MAX_RPM = float(os.getenv("VERTEX_MAX_RPM", "600"))
+VERTEX_MAX_TPM = float(os.getenv("VERTEX_MAX_TPM", "1000000"))
+VERTEX_MAX_CONCURRENCY = int(os.getenv("VERTEX_MAX_CONCURRENCY", "16"))
+VERTEX_MAX_RETRIES = int(os.getenv("VERTEX_MAX_RETRIES", "4"))
+VERTEX_RETRY_BASE_SECONDS = float(os.getenv("VERTEX_RETRY_BASE_SECONDS", "1.0"))
+# Output tokens reserved per call until the real usage is known
+EXPECTED_OUTPUT_TOKENS = 1024
+
+T = TypeVar("T")
+
+THROTTLED = metrics.registry.counter(
+    "travel_vertex_throttled_total", "Vertex calls rejected with 429 / RESOURCE_EXHAUSTED", ["chain"]
+)
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    """
+    True for Vertex quota / 429 errors, whichever client layer raised them.
+    Decided on the exception type or its status code (also of the errors it
+    wraps), never the message: a parsed response may well contain "429".
+    """
+    seen = 0
+    while error is not None and seen < 5:
+        if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+            return True
+        for attr in ("code", "status_code"):
+            if getattr(error, attr, None) == 429:
+                return True
+        error = error.__cause__
+        seen += 1
+    return False
+
+
+class TokenBucket:
+    """Refills at `per_minute / 60` units per second up to one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = per_minute
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, amount: float) -> None:
+        """Spends `amount` (a negative amount refunds); the level may go below zero."""
+        self._refill()
+        self.level = min(self.capacity, self.level - amount)
+
+
+@dataclass
+class Permit:
+    chain: str
+    reserved_tokens: int
+    used_tokens: Optional[int] = None
+
+    def record_usage(self, usage: Optional[dict]) -> None:
+        if usage and usage.get("total_tokens"):
+            self.used_tokens = usage["total_tokens"]
+
+
+class VertexGovernor:
+    def __init__(self, max_rpm: float = VERTEX_MAX_RPM, max_tpm: float = VERTEX_MAX_TPM,
+                 max_concurrency: int = VERTEX_MAX_CONCURRENCY, max_retries: int = VERTEX_MAX_RETRIES,
+                 retry_base_seconds: float = VERTEX_RETRY_BASE_SECONDS):
+        self.requests = TokenBucket(max_rpm)
+        self.tokens = TokenBucket(max_tpm)
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.in_flight = 0
+        self._waiting: list = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._changed = asyncio.Condition()
+
+    def _admission_delay(self, entry, tokens: int) -> Optional[float]:
+        """None while blocked by priority or concurrency, else seconds until the buckets allow it."""
+        if self._waiting[0] != entry or self.in_flight >= int(self.limit):
+            return None
+        return max(self.requests.delay(1), self.tokens.delay(tokens))
+
+    async def _acquire(self, priority: int, tokens: int) -> None:
+        entry = (priority, next(self._sequence))
+        async with self._changed:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    delay = self._admission_delay(entry, tokens)
+                    if delay == 0:
+                        break
+                    try:
+                        await asyncio.wait_for(self._changed.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+                self._changed.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self.in_flight += 1
+            self._changed.notify_all()
+
+    async def _release(self, permit: Permit, throttled: bool) -> None:
+        async with self._changed:
+            self.in_flight -= 1
+            if permit.used_tokens is not None:
+                self.tokens.take(permit.used_tokens - permit.reserved_tokens)
+            if throttled:
+                # Multiplicative decrease
+                self.limit = max(1.0, self.limit / 2)
+            else:
+                # Additive increase: about +1 per `limit` successful calls
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._changed.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, chain: str, priority: int, estimated_tokens: int) -> AsyncIterator[Permit]:
+        """Holds one admitted Vertex call for the duration of the block."""
+        reserved = estimated_tokens + EXPECTED_OUTPUT_TOKENS
+        await self._acquire(priority, reserved)
+        permit = Permit(chain=chain, reserved_tokens=reserved)
+        throttled = False
+        try:
+            yield permit
+        except Exception as e:
+            throttled = is_rate_limited(e)
+            if throttled:
+                THROTTLED.inc(chain=chain)
+            raise
+        finally:
+            await self._release(permit, throttled)
+
+    def retry_delay(self, attempt: int) -> float:
+        return self.retry_base_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        return attempt < self.max_retries and is_rate_limited(error)
+
+    async def call(self, chain: str, priority: int, estimated_tokens: int,
+                   fn: Callable[[Permit], Awaitable[T]]) -> T:
+        """Runs `fn(permit)` inside a slot, retrying rate-limit errors with backoff."""
+        attempt = 0
+        while True:
+            try:
+                async with self.slot(chain, priority, estimated_tokens) as permit:
+                    return await fn(permit)
+            except Exception as e:
+                if not self.should_retry(e, attempt):
+                    raise
+            await asyncio.sleep(self.retry_delay(attempt))
+            attempt += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {"limit": self.limit, "in_flight": self.in_flight, "waiting": len(self._waiting)}
+
+
+vertex_governor = VertexGovernor()
+
+metrics.registry.gauge("travel_vertex_concurrency_limit", "Current adaptive Vertex concurrency limit",
+                       lambda: vertex_governor.stats()["limit"])
+metrics.registry.gauge("travel_vertex_in_flight", "Vertex calls in flight",
+                       lambda: vertex_governor.stats()["in_flight"])
+metrics.registry.gauge("travel_vertex_waiting", "Vertex calls waiting for admission",
+                       lambda: vertex_governor.stats()["waiting"])
@@ -0,0 +1,138 @@
+"""
+Incremental parsing of a JSON object as it streams out of an LLM.
+
+The planner's TripPlan is several thousand tokens long. `JsonStreamParser`
+scans each chunk once, tracks bracket depth outside strings, and hands back
+every element of one top-level array (the itinerary) as soon as its closing
+brace arrives. It also keeps the raw text of every top-level member that was
+closed, so a truncated or malformed response can be salvaged from the parts
+that did complete instead of failing the whole run.
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class JsonStreamParser:
+    """
+    Feed text chunks with `feed()`; it returns the elements of `array_key`
+    (a key of the root object) completed by that chunk. Text before the root
+    object (e.g. a ```json fence) and after it is ignored.
+    """
+
+    def __init__(self, array_key: str):
+        self.array_key = array_key
+        self._text = ""
+        self._pos = 0
+        # One frame per open container: [kind, key of the value being parsed, is_target_array]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        # Elements of the target array parsed so far, in order
+        self._items: List[Dict[str, Any]] = []
+        # Raw text of each completed top-level member, and the one being parsed
+        self._members: Dict[str, str] = {}
+        self._member: Optional[Tuple[str, int]] = None
+
+    @property
+    def complete(self) -> bool:
+        return self._root_end is not None
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        items: List[Dict[str, Any]] = []
+        if self._root_end is not None or not chunk:
+            return items
+        self._text += chunk
+        text = self._text
+        stack = self._stack
+
+        for i in range(self._pos, len(text)):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:i + 1]
+                continue
+
+            if not stack:
+                if c == "{":
+                    stack.append(["{", None, False])
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and stack[-1][0] == "{" and self._last_string is not None:
+                try:
+                    stack[-1][1] = json.loads(self._last_string)
+                except ValueError:
+                    stack[-1][1] = None
+                if len(stack) == 1 and isinstance(stack[-1][1], str):
+                    self._member = (stack[-1][1], i + 1)
+            elif c in "{[":
+                parent = stack[-1]
+                is_target = (c == "[" and len(stack) == 1 and parent[1] == self.array_key)
+                if c == "{" and parent[2]:
+                    self._item_start = i
+                stack.append([c, None, is_target])
+            elif c in "}]":
+                stack.pop()
+                if not stack:
+                    self._end_member(i)
+                    self._root_end = i + 1
+                    self._pos = i + 1
+                    self._items.extend(items)
+                    return items
+                if c == "}" and stack[-1][2] and self._item_start is not None:
+                    try:
+                        items.append(json.loads(text[self._item_start:i + 1]))
+                    except ValueError:
+                        pass  # a malformed item is skipped; later items still count
+                    self._item_start = None
+            elif c == ",":
+                if stack[-1][0] == "{":
+                    stack[-1][1] = None
+                if len(stack) == 1:
+                    self._end_member(i)
+            if c != '"' and not c.isspace() and c != ":":
+                self._last_string = None
+
+        self._pos = len(text)
+        self._items.extend(items)
+        return items
+
+    def _end_member(self, end: int) -> None:
+        if self._member is not None:
+            key, start = self._member
+            self._members[key] = self._text[start:end]
+            self._member = None
+
+    def salvage(self) -> Optional[Dict[str, Any]]:
+        """
+        The root object rebuilt from the parts that completed: every closed
+        top-level member that is valid JSON, with `array_key` holding only
+        the elements `feed()` returned. A truncated tail or a partial element
+        is dropped rather than closed up. None if nothing usable arrived.
+        """
+        result: Dict[str, Any] = {}
+        for key, raw in self._members.items():
+            if key == self.array_key:
+                continue
+            try:
+                result[key] = json.loads(raw)
+            except ValueError:
+                continue
+        if self._items:
+            result[self.array_key] = list(self._items)
+        return result or None
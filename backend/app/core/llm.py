@@ -0,0 +1,366 @@
+"""
+Process-wide registry of Vertex AI clients and agent prompts.
+
+Agents used to build a fresh ChatVertexAI client and prompt chain on every
+call. The registry builds each client once per (model, temperature,
+max_tokens) and each prompt template once per agent, so connections and auth
+are reused across nodes, revision loops and requests.
+"""
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_google_vertexai import ChatVertexAI
+
+from app.core.cassettes import llm_cassette, recording, replaying
+from app.core.context_budget import estimate_tokens
+from app.core.governor import Permit, vertex_governor
+from app.core.llm_cache import LLM_CACHE_ENABLED, cache_key, llm_response_cache
+from app.core.metrics import LLM_CALLS, record_llm_usage
+from app.core.prompts import (
+    ACTIVITIES_SYSTEM_PROMPT,
+    BUDGET_SYSTEM_PROMPT,
+    HOTEL_SYSTEM_PROMPT,
+    LOGISTICS_SYSTEM_PROMPT,
+    PLANNER_SYSTEM_PROMPT,
+    RESEARCHER_SYSTEM_PROMPT,
+)
+from app.schemas.itinerary import TripPlan
+
+DEFAULT_MODEL = os.getenv("VERTEX_MODEL", "gemini-2.5-flash")
+
+# Replayed responses are streamed back in pieces of roughly this size
+REPLAY_CHUNK_CHARS = 256
+
+SEARCH_RESULTS_SUFFIX = "\n\nWeb Search Results:\n{search_context}"
+
+SchemaT = TypeVar("SchemaT", bound=BaseModel)
+
+
+class StructuredOutputError(ValueError):
+    """The model's response didn't parse or didn't validate against the requested schema."""
+
+# Shared by the planner chain (format instructions) and planner_node (parsing)
+PLANNER_OUTPUT_PARSER = JsonOutputParser(pydantic_object=TripPlan)
+
+
+@dataclass(frozen=True)
+class ChainSpec:
+    template: str
+    temperature: float
+    max_tokens: int = 8000
+    model: str = DEFAULT_MODEL
+    # Vertex governor admission order: lower goes first, so later pipeline
+    # stages (runs close to finishing) beat earlier ones (fresh runs)
+    priority: int = 5
+
+
+CHAIN_SPECS: Dict[str, ChainSpec] = {
+    "research": ChainSpec(RESEARCHER_SYSTEM_PROMPT + SEARCH_RESULTS_SUFFIX, temperature=0.7, priority=4),
+    "hotel": ChainSpec(HOTEL_SYSTEM_PROMPT + SEARCH_RESULTS_SUFFIX, temperature=0.3, priority=3),
+    "budget": ChainSpec(BUDGET_SYSTEM_PROMPT + SEARCH_RESULTS_SUFFIX, temperature=0.2, priority=2),
+    "logistics": ChainSpec(LOGISTICS_SYSTEM_PROMPT + SEARCH_RESULTS_SUFFIX, temperature=0.3, priority=3),
+    "activities": ChainSpec(ACTIVITIES_SYSTEM_PROMPT + SEARCH_RESULTS_SUFFIX, temperature=0.4, priority=3),
+    "planner": ChainSpec(PLANNER_SYSTEM_PROMPT + "\n\n{format_instructions}", temperature=0.2, priority=0),
+}
+
+
+class LLMRegistry:
+    """
+    Holds long-lived ChatVertexAI clients, agent prompt templates and
+    structured-output wrappers. Safe to share between concurrent requests.
+    """
+
+    def __init__(self, project: str | None = None, location: str | None = None):
+        self.project = project or os.getenv("GOOGLE_CLOUD_PROJECT")
+        self.location = location or os.getenv("GOOGLE_CLOUD_LOCATION", "us-central1")
+        self._llms: Dict[Tuple[str, float, int], ChatVertexAI] = {}
+        self._prompts: Dict[str, ChatPromptTemplate] = {}
+        self._structured: Dict[Tuple[str, Type[BaseModel]], Any] = {}
+        self._lock = threading.Lock()
+
+    def get_llm(self, model: str = DEFAULT_MODEL, temperature: float = 0.2, max_tokens: int = 8000) -> ChatVertexAI:
+        key = (model, temperature, max_tokens)
+        with self._lock:
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = ChatVertexAI(
+                    model=model,
+                    project=self.project,
+                    location=self.location,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+                self._llms[key] = llm
+            return llm
+
+    def get_prompt(self, name: str) -> ChatPromptTemplate:
+        with self._lock:
+            prompt = self._prompts.get(name)
+        if prompt is None:
+            spec = CHAIN_SPECS[name]
+            prompt = ChatPromptTemplate.from_template(spec.template)
+            if name == "planner":
+                prompt = prompt.partial(format_instructions=PLANNER_OUTPUT_PARSER.get_format_instructions())
+            with self._lock:
+                prompt = self._prompts.setdefault(name, prompt)
+        return prompt
+
+    def get_structured_llm(self, name: str, schema: Type[BaseModel]):
+        """The agent's LLM constrained to return `schema` (Gemini JSON mode)."""
+        key = (name, schema)
+        with self._lock:
+            llm = self._structured.get(key)
+        if llm is None:
+            spec = CHAIN_SPECS[name]
+            base = self.get_llm(spec.model, spec.temperature, spec.max_tokens)
+            # include_raw keeps the AIMessage (and its token usage) next to the parsed schema
+            llm = base.with_structured_output(schema, method="json_mode", include_raw=True)
+            with self._lock:
+                llm = self._structured.setdefault(key, llm)
+        return llm
+
+
+_registry: LLMRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> LLMRegistry:
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = LLMRegistry()
+    return _registry
+
+
+def _governed(name: str, request: str):
+    """Arguments for the Vertex governor: chain, its priority and the prompt's token estimate."""
+    return name, CHAIN_SPECS[name].priority, estimate_tokens(request)
+
+
+async def _ainvoke_llm(name: str, prompt_value) -> AIMessage:
+    """One LLM call for an agent chain, governed and recorded or replayed per CASSETTE_MODE."""
+    request = prompt_value.to_string()
+
+    async def call(permit: Permit) -> AIMessage:
+        if replaying():
+            entry = await llm_cassette.areplay(name, request)
+            response = AIMessage(content=entry["response"], usage_metadata=entry.get("usage"))
+        else:
+            spec = CHAIN_SPECS[name]
+            start = time.perf_counter()
+            response = await get_registry().get_llm(spec.model, spec.temperature, spec.max_tokens).ainvoke(prompt_value)
+            if recording():
+                await llm_cassette.arecord(name, request, response.content, (time.perf_counter() - start) * 1000,
+                                           usage=response.usage_metadata)
+        permit.record_usage(response.usage_metadata)
+        return response
+
+    return await vertex_governor.call(*_governed(name, request), call)
+
+
+async def _astream_llm(name: str, prompt_value) -> AsyncIterator[AIMessageChunk]:
+    """
+    Streaming counterpart of _ainvoke_llm; replays spread the latency over the
+    chunks. A rate-limited stream is retried only if nothing was yielded yet.
+    """
+    request = prompt_value.to_string()
+    attempt = 0
+    while True:
+        yielded = False
+        try:
+            async with vertex_governor.slot(*_governed(name, request)) as permit:
+                async for chunk in _astream_attempt(name, prompt_value, request):
+                    permit.record_usage(chunk.usage_metadata)
+                    yielded = True
+                    yield chunk
+            return
+        except Exception as e:
+            if yielded or not vertex_governor.should_retry(e, attempt):
+                raise
+        await asyncio.sleep(vertex_governor.retry_delay(attempt))
+        attempt += 1
+
+
+async def _astream_attempt(name: str, prompt_value, request: str) -> AsyncIterator[AIMessageChunk]:
+    if replaying():
+        entry = await asyncio.to_thread(llm_cassette.lookup, name, request)
+        content = entry["response"]
+        chunks = [content[i:i + REPLAY_CHUNK_CHARS] for i in range(0, len(content), REPLAY_CHUNK_CHARS)] or [""]
+        pause = llm_cassette.delay_seconds(entry) / len(chunks)
+        for i, text in enumerate(chunks):
+            await asyncio.sleep(pause)
+            last = i == len(chunks) - 1
+            yield AIMessageChunk(content=text, usage_metadata=entry.get("usage") if last else None)
+        return
+
+    spec = CHAIN_SPECS[name]
+    start = time.perf_counter()
+    parts = []
+    usage = None
+    async for chunk in get_registry().get_llm(spec.model, spec.temperature, spec.max_tokens).astream(prompt_value):
+        if getattr(chunk, "usage_metadata", None):
+            usage = chunk.usage_metadata
+        parts.append(chunk.content or "")
+        yield chunk
+    if recording():
+        await llm_cassette.arecord(name, request, "".join(parts), (time.perf_counter() - start) * 1000, usage=usage)
+
+
+async def _ainvoke_structured(name: str, prompt_value, schema: Type[SchemaT]) -> SchemaT:
+    group = f"{name}.{schema.__name__}"
+    request = prompt_value.to_string()
+
+    async def call(permit: Permit) -> Tuple[AIMessage, Any, BaseException | None]:
+        if replaying():
+            entry = await llm_cassette.areplay(group, request)
+            raw = AIMessage(content=entry["response"], usage_metadata=entry.get("usage"))
+            parsed, error = None, None
+            try:
+                # Same parsing as the json_mode structured output
+                parsed = schema.model_validate(JsonOutputParser().parse(raw.content))
+            except Exception as e:
+                error = e
+        else:
+            start = time.perf_counter()
+            output = await get_registry().get_structured_llm(name, schema).ainvoke(prompt_value)
+            raw, parsed, error = output["raw"], output["parsed"], output.get("parsing_error")
+            if recording():
+                await llm_cassette.arecord(group, request, raw.content, (time.perf_counter() - start) * 1000,
+                                           usage=raw.usage_metadata)
+        permit.record_usage(raw.usage_metadata)
+        return raw, parsed, error
+
+    raw, parsed, error = await vertex_governor.call(*_governed(name, request), call)
+    record_llm_usage(name, raw)
+    # Raised outside the governed call: a bad response is not throttling, so it isn't retried
+    if error is not None:
+        raise StructuredOutputError(f"{group}: {error}") from error
+    if not isinstance(parsed, schema):
+        raise StructuredOutputError(f"{group}: no parsed output")
+    return parsed
+
+
+def _is_valid(validate: Callable[[str], Any] | None, content: str) -> bool:
+    if validate is None:
+        return True
+    try:
+        validate(content)
+    except Exception:
+        return False
+    return True
+
+
+async def invoke_chain(
+    name: str,
+    inputs: Dict[str, Any],
+    cache: bool = False,
+    validate: Callable[[str], Any] | None = None,
+) -> str:
+    """
+    Renders an agent's prompt, calls its shared LLM and returns the response text.
+
+    With `cache=True` the prompt is rendered first and looked up in the
+    persistent LLM response cache; a hit skips the Vertex call entirely.
+    A response is only stored if `validate` (when given) accepts it without
+    raising, so truncated or unparseable output is never cached.
+    """
+    spec = CHAIN_SPECS[name]
+    prompt_value = await get_registry().get_prompt(name).ainvoke(inputs)
+    use_cache = cache and LLM_CACHE_ENABLED
+    if use_cache:
+        key = cache_key(spec.model, spec.temperature, prompt_value.to_string())
+        cached = await llm_response_cache.aget(key)
+        if cached is not None:
+            LLM_CALLS.inc(chain=name, cache="hit")
+            return cached
+
+    LLM_CALLS.inc(chain=name, cache="miss" if use_cache else "off")
+    response = await _ainvoke_llm(name, prompt_value)
+    record_llm_usage(name, response)
+    if use_cache and _is_valid(validate, response.content):
+        await llm_response_cache.aset(key, response.content)
+    return response.content
+
+
+async def stream_chain(
+    name: str,
+    inputs: Dict[str, Any],
+    cache: bool = False,
+    validate: Callable[[str], Any] | None = None,
+) -> AsyncIterator[str]:
+    """
+    Like invoke_chain, but yields the response text chunk by chunk as Vertex
+    streams it. A cache hit is yielded as a single chunk; a streamed response
+    is cached only once it has arrived in full and passed `validate`.
+    """
+    spec = CHAIN_SPECS[name]
+    prompt_value = await get_registry().get_prompt(name).ainvoke(inputs)
+    use_cache = cache and LLM_CACHE_ENABLED
+    if use_cache:
+        key = cache_key(spec.model, spec.temperature, prompt_value.to_string())
+        cached = await llm_response_cache.aget(key)
+        if cached is not None:
+            LLM_CALLS.inc(chain=name, cache="hit")
+            yield cached
+            return
+
+    LLM_CALLS.inc(chain=name, cache="miss" if use_cache else "off")
+    parts = []
+    usage_chunk = None
+    async for chunk in _astream_llm(name, prompt_value):
+        if getattr(chunk, "usage_metadata", None):
+            usage_chunk = chunk  # Vertex reports usage for the whole response on the last chunk
+        if chunk.content:
+            parts.append(chunk.content)
+            yield chunk.content
+    record_llm_usage(name, usage_chunk)
+    content = "".join(parts)
+    if use_cache and _is_valid(validate, content):
+        await llm_response_cache.aset(key, content)
+
+
+async def invoke_structured(
+    name: str,
+    inputs: Dict[str, Any],
+    schema: Type[SchemaT],
+    cache: bool = False,
+) -> SchemaT:
+    """
+    Runs an agent's prompt against its LLM in JSON mode and returns a
+    validated `schema` instance. `cache=True` behaves as in invoke_chain;
+    cached entries are stored as the schema's JSON.
+
+    Raises:
+        StructuredOutputError if the response doesn't parse into `schema`.
+    """
+    spec = CHAIN_SPECS[name]
+    prompt_value = await get_registry().get_prompt(name).ainvoke(inputs)
+    use_cache = cache and LLM_CACHE_ENABLED
+    if use_cache:
+        # The schema is part of the key: same prompt, different output contract
+        key = cache_key(spec.model, spec.temperature, f"{schema.__name__}\n{prompt_value.to_string()}")
+        cached = await llm_response_cache.aget(key)
+        if cached is not None:
+            try:
+                result = schema.model_validate_json(cached)
+            except ValidationError:
+                result = None  # stored under an older schema; ask the model again
+            if result is not None:
+                LLM_CALLS.inc(chain=name, cache="hit")
+                return result
+
+    LLM_CALLS.inc(chain=name, cache="miss" if use_cache else "off")
+    result = await _ainvoke_structured(name, prompt_value, schema)
+    if use_cache:
+        await llm_response_cache.aset(key, result.model_dump_json())
+    return result
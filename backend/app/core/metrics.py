@@ -0,0 +1,209 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+A deliberately small registry (counters, gauges from callbacks and
+fixed-bucket histograms, all with labels) so the app needs no metrics client
+library. Graph nodes are timed by the `instrumented` decorator; the LLM and
+search layers record token usage and call counts directly. GET /metrics
+serves `render()`.
+"""
+import inspect
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Node and call latencies span ~1 ms (cache hits) to minutes (planner)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}")
+        return lines
+
+
+class CallbackGauge:
+    """Gauge whose value is read from `callback()` at scrape time."""
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.callback())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {_format_value(value)}"]
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> (per-bucket counts, sum, count)
+        self._series: Dict[LabelValues, Tuple[List[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labels)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._series[key] = (counts, total + value, count + 1)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts, strict=True):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, callback: Callable[[], float]) -> CallbackGauge:
+        return self.register(CallbackGauge(name, help, callback))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+NODE_DURATION = registry.histogram(
+    "travel_node_duration_seconds", "Graph node latency", ["node"]
+)
+NODE_ERRORS = registry.counter(
+    "travel_node_errors_total", "Graph node executions that raised", ["node"]
+)
+NODE_SKIPS = registry.counter(
+    "travel_node_skipped_total", "Revision-loop node runs skipped because their inputs were unchanged", ["node"]
+)
+REVISION_LOOPS = registry.counter(
+    "travel_revision_loops_total", "Planner -> hotel revision loops taken"
+)
+LLM_CALLS = registry.counter(
+    "travel_llm_calls_total", "LLM calls by agent chain and response-cache outcome", ["chain", "cache"]
+)
+LLM_TOKENS = registry.counter(
+    "travel_llm_tokens_total", "LLM tokens reported by Vertex, by agent chain", ["chain", "direction"]
+)
+SEARCH_CALLS = registry.counter(
+    "travel_search_calls_total", "Web searches by outcome (hit = served from the search cache, skipped = circuit breaker open)", ["outcome"]
+)
+SEARCH_ATTEMPTS = registry.counter(
+    "travel_search_attempts_total", "DuckDuckGo requests by kind (first, hedge after the p95 delay, retry)", ["kind"]
+)
+SEARCH_DURATION = registry.histogram(
+    "travel_search_duration_seconds", "DuckDuckGo request latency (cache misses only)"
+)
+
+
+def record_llm_usage(chain: str, message) -> None:
+    """Adds the token counts from an AIMessage's usage_metadata, when present."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage.get("input_tokens"):
+        LLM_TOKENS.inc(usage["input_tokens"], chain=chain, direction="input")
+    if usage.get("output_tokens"):
+        LLM_TOKENS.inc(usage["output_tokens"], chain=chain, direction="output")
+
+
+def instrumented(name: str):
+    """Decorator recording a graph node's latency and errors (sync or async nodes)."""
+
+    def decorator(node):
+        if inspect.iscoroutinefunction(node):
+            @wraps(node)
+            async def async_wrapper(state):
+                start = time.perf_counter()
+                try:
+                    return await node(state)
+                except Exception:
+                    NODE_ERRORS.inc(node=name)
+                    raise
+                finally:
+                    NODE_DURATION.observe(time.perf_counter() - start, node=name)
+
+            return async_wrapper
+
+        @wraps(node)
+        def wrapper(state):
+            start = time.perf_counter()
+            try:
+                return node(state)
+            except Exception:
+                NODE_ERRORS.inc(node=name)
+                raise
+            finally:
+                NODE_DURATION.observe(time.perf_counter() - start, node=name)
+
+        return wrapper
+
+    return decorator
@@ -11,7 +11,7 @@ Inputs:
 - Logistics: {logistics_info}
 - Activities: {activities_recommendations}
 
-Output strictly valid JSON conforming to the TripPlan schema.
+Output strictly valid JSON conforming to the TripPlan schema, writing the fields in schema order (itinerary before hotels, budget and packing list).
 Ensure the itinerary is logical (no teleporting).
 Include booking links where available.
 Create a day-by-day schedule with morning, afternoon, and evening activities.
@@ -44,7 +44,8 @@ For each hotel, provide:
 6. Key amenities
 
 Prioritize location, value, and alignment with traveler interests.
-Output a structured summary that the planner can use."""
+Return the hotels as structured data: name, area, price_per_night (USD), rating,
+booking_link, and a description covering fit and key amenities."""
 
 BUDGET_SYSTEM_PROMPT = """You are a Travel Budget Analyst.
 Calculate a detailed cost breakdown for this trip:
@@ -73,12 +74,9 @@ For each category:
 - Explain the calculation basis
 - Note if it's conservative or optimistic
 
-End with:
-- Total Estimated Budget
-- Daily Budget Per Person
-- Cost-saving tips for this destination
-
-Output a clear, structured budget summary."""
+Return the USD total for the whole party per category as structured data
+(include miscellaneous costs under activities; the overall total is computed for you).
+Put the calculation basis, daily budget per person and cost-saving tips in notes."""
 
 LOGISTICS_SYSTEM_PROMPT = """You are a Transportation & Logistics Coordinator.
 Plan the transportation logistics for:
@@ -122,7 +120,9 @@ Provide recommendations for:
    - Traffic/rush hour considerations
    - Safety tips
 
-Output a comprehensive logistics plan."""
+Return the flight/train/bus/cab options as structured transport options
+(type, provider, departure, arrival, estimated_price in USD, booking_link) and put
+arrival, local transportation and routing advice in notes."""
 
 ACTIVITIES_SYSTEM_PROMPT = """You are a Tours & Activities Curator.
 Find bookable experiences, activities, and dining options for:
@@ -136,7 +136,6 @@ Find bookable experiences, activities, and dining options for:
 Context from other agents:
 - Research: {research_notes}
 - Weather: {weather_info}
-- Hotels: {hotel_recommendations}
 
 Recommend 8-12 activities/experiences across these categories:
 
@@ -0,0 +1,41 @@
+"""
+Canonical identity of a TripSpec.
+
+Two requests that differ only in letter case, whitespace, the spelling of a
+known place ("NYC" vs "new york city") or the order of interests and
+constraints describe the same trip. `spec_key` maps them to one hash so
+identical runs can be shared.
+"""
+import hashlib
+import json
+from typing import Any, Dict, List
+
+from app.schemas.requests import TripSpec
+from app.tools.gazetteer import normalize_place_name, resolve_place
+
+
+def _canonical_place(name: str) -> str:
+    place = resolve_place(name)
+    return normalize_place_name(place.display_name if place is not None else name)
+
+
+def _canonical_list(values: List[str]) -> List[str]:
+    return sorted({" ".join(value.lower().split()) for value in values if value.strip()})
+
+
+def canonical_spec(spec: TripSpec) -> Dict[str, Any]:
+    return {
+        "origin": _canonical_place(spec.origin),
+        "destination": _canonical_place(spec.destination),
+        "dates": "".join(spec.dates.lower().split()),
+        "travelers": spec.travelers,
+        "budget_tier": spec.budget_tier.strip().lower(),
+        "interests": _canonical_list(spec.interests),
+        "constraints": _canonical_list(spec.constraints),
+        "travel_style": spec.travel_style.strip().lower(),
+    }
+
+
+def spec_key(spec: TripSpec) -> str:
+    payload = json.dumps(canonical_spec(spec), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -1,9 +1,22 @@
+import os
+from sqlalchemy import event
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "trips.db"
-sqlite_url = f"sqlite:///{sqlite_file_name}"
+sqlite_url = os.getenv("DATABASE_URL", f"sqlite:///{sqlite_file_name}")
 
-engine = create_engine(sqlite_url, connect_args={"check_same_thread": False})
+connect_args = {"check_same_thread": False} if sqlite_url.startswith("sqlite") else {}
+engine = create_engine(sqlite_url, connect_args=connect_args)
+
+if sqlite_url.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers in other uvicorn workers proceed while one worker writes
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA busy_timeout=5000")
+        cursor.close()
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
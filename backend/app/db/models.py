@@ -1,10 +1,22 @@
 from typing import Optional
 from sqlmodel import Field, SQLModel
-from datetime import datetime
+from datetime import datetime, timezone
+
+
+def utcnow() -> datetime:
+    # Timezone-aware: sqlmodel refuses naive datetimes on insert
+    return datetime.now(timezone.utc)
+
 
 class Trip(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    run_id: str = Field(index=True)
+    run_id: str = Field(index=True, unique=True)
     destination: str
     plan_json: str # Storing the full JSON blob simplified
-    created_at: datetime = Field(default_factory=datetime.utcnow)
+    created_at: datetime = Field(default_factory=utcnow, index=True)
+
+class PlanCacheEntry(SQLModel, table=True):
+    """Completed plan keyed by the canonical TripSpec hash (see app.core.spec_key)."""
+    key: str = Field(primary_key=True)
+    plan_json: str
+    created_at: datetime = Field(default_factory=utcnow, index=True)
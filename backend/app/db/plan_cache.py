@@ -0,0 +1,63 @@
+"""
+Whole-plan result cache.
+
+Completed TripPlans are stored in the app database under the canonical hash
+of their TripSpec, so a repeat request for the same trip is answered without
+running the graph, across restarts and workers. Entries expire after
+PLAN_CACHE_TTL_SECONDS (forecasts and prices go stale) and the table is kept
+to PLAN_CACHE_MAX_ENTRIES rows, oldest evicted first.
+"""
+import asyncio
+import os
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.core.spec_key import spec_key
+from app.db.database import engine
+from app.db.models import PlanCacheEntry, utcnow
+from app.schemas.itinerary import TripPlan
+from app.schemas.requests import TripSpec
+
+PLAN_CACHE_ENABLED = os.getenv("PLAN_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+PLAN_CACHE_TTL_SECONDS = float(os.getenv("PLAN_CACHE_TTL_SECONDS", "21600"))
+PLAN_CACHE_MAX_ENTRIES = int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "1000"))
+
+
+def get_cached_plan(spec: TripSpec) -> Optional[TripPlan]:
+    key = spec_key(spec)
+    with Session(engine) as session:
+        entry = session.get(PlanCacheEntry, key)
+        if entry is None:
+            return None
+        if entry.created_at < utcnow() - timedelta(seconds=PLAN_CACHE_TTL_SECONDS):
+            session.delete(entry)
+            session.commit()
+            return None
+        return TripPlan.model_validate_json(entry.plan_json)
+
+
+def cache_plan(spec: TripSpec, plan: TripPlan) -> None:
+    with Session(engine) as session:
+        session.merge(PlanCacheEntry(key=spec_key(spec), plan_json=plan.model_dump_json()))
+        # Keep the table bounded: drop the oldest rows beyond the limit
+        stale = (
+            select(PlanCacheEntry.key)
+            .order_by(PlanCacheEntry.created_at.desc())
+            .offset(PLAN_CACHE_MAX_ENTRIES)
+        )
+        session.execute(delete(PlanCacheEntry).where(PlanCacheEntry.key.in_(stale)))
+        session.commit()
+
+
+async def aget_cached_plan(spec: TripSpec) -> Optional[TripPlan]:
+    if not PLAN_CACHE_ENABLED or spec.force_refresh:
+        return None
+    return await asyncio.to_thread(get_cached_plan, spec)
+
+
+async def acache_plan(spec: TripSpec, plan: TripPlan) -> None:
+    if PLAN_CACHE_ENABLED:
+        await asyncio.to_thread(cache_plan, spec, plan)
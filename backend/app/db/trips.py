@@ -0,0 +1,53 @@
+"""
+Durable trip store on top of the SQLModel `Trip` table.
+
+SQLite access is blocking, so the async helpers run each query in a worker
+thread to keep FastAPI handlers and graph runs off the hot path.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, select
+
+from app.db.database import engine
+from app.db.models import Trip
+from app.schemas.itinerary import TripPlan
+
+
+def save_trip(run_id: str, destination: str, plan: TripPlan) -> None:
+    with Session(engine) as session:
+        session.add(Trip(run_id=run_id, destination=destination, plan_json=plan.model_dump_json()))
+        session.commit()
+
+
+def get_trip(run_id: str) -> Optional[TripPlan]:
+    with Session(engine) as session:
+        trip = session.exec(select(Trip).where(Trip.run_id == run_id)).first()
+        if trip is None:
+            return None
+        return TripPlan.model_validate_json(trip.plan_json)
+
+
+def list_trips(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    with Session(engine) as session:
+        # Only the summary columns; plan blobs stay on disk
+        rows = session.exec(
+            select(Trip.run_id, Trip.destination, Trip.created_at)
+            .order_by(Trip.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        ).all()
+        return [{"id": run_id, "destination": destination, "created_at": created_at}
+                for run_id, destination, created_at in rows]
+
+
+async def asave_trip(run_id: str, destination: str, plan: TripPlan) -> None:
+    await asyncio.to_thread(save_trip, run_id, destination, plan)
+
+
+async def aget_trip(run_id: str) -> Optional[TripPlan]:
+    return await asyncio.to_thread(get_trip, run_id)
+
+
+async def alist_trips(limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+    return await asyncio.to_thread(list_trips, limit, offset)
@@ -0,0 +1,99 @@
+"""
+Per-node deadlines carved out of one latency budget per plan run.
+
+Each agent node gets a share of PLAN_DEADLINE_SECONDS, capped by whatever is
+left of the run's overall budget (`deadline_at` in the state). A node that
+misses its deadline is cancelled and re-run on its mock path, which is
+deterministic and needs no network, and its section is recorded in
+`degraded_sections`. Once the run's budget is spent the remaining nodes go
+straight to their fallbacks, so a run can't take much longer than the budget
+whatever DuckDuckGo or Vertex are doing. A node whose model response doesn't
+fit its output schema falls back the same way.
+"""
+import asyncio
+import os
+import time
+from functools import wraps
+from typing import List, Optional
+
+from app.core import metrics
+from app.core.llm import StructuredOutputError
+from app.tools.mocks import mock_fallback
+
+# Latency budget for a whole plan run; 0 disables deadlines
+PLAN_DEADLINE_SECONDS = float(os.getenv("PLAN_DEADLINE_SECONDS", "180"))
+
+# Fraction of the budget each node may use. The critical path (research,
+# hotel, budget, planner) sums to 1; the branches running beside it get no
+# more than the stretch of the path they run alongside (weather: research,
+# logistics: hotel, activities: hotel + budget).
+NODE_DEADLINE_SHARES = {
+    "research": 0.2,
+    "weather": 0.1,
+    "hotel": 0.15,
+    "logistics": 0.15,
+    "activities": 0.25,
+    "budget": 0.1,
+    "planner": 0.55,
+}
+
+NODE_DEGRADED = metrics.registry.counter(
+    "travel_node_degraded_total",
+    "Graph nodes that missed their deadline or got unusable model output and served mock output", ["node"]
+)
+
+
+def merge_sections(left: List[str], right: List[str]) -> List[str]:
+    """State reducer: union of degraded sections, in the order they were first reported."""
+    merged = list(left or [])
+    for section in right or []:
+        if section not in merged:
+            merged.append(section)
+    return merged
+
+
+def run_deadline(budget_seconds: float = PLAN_DEADLINE_SECONDS) -> Optional[float]:
+    """`time.monotonic()` value by which a run starting now should finish."""
+    return time.monotonic() + budget_seconds if budget_seconds > 0 else None
+
+
+def node_timeout(name: str, state, budget_seconds: float = PLAN_DEADLINE_SECONDS) -> Optional[float]:
+    """Seconds `name` may run for, or None when deadlines are off."""
+    if budget_seconds <= 0 or name not in NODE_DEADLINE_SHARES:
+        return None
+    timeout = NODE_DEADLINE_SHARES[name] * budget_seconds
+    deadline_at = state.get("deadline_at")
+    if deadline_at is not None:
+        timeout = min(timeout, deadline_at - time.monotonic())
+    return max(0.0, timeout)
+
+
+def with_deadline(name: str, budget_seconds: float = PLAN_DEADLINE_SECONDS):
+    """
+    Decorator for an async agent node: cancels it after its share of the run
+    budget, or catches a StructuredOutputError, and returns its mock output
+    instead, marked as degraded.
+    """
+
+    def decorator(node):
+        @wraps(node)
+        async def wrapper(state):
+            timeout = node_timeout(name, state, budget_seconds)
+            try:
+                if timeout is None:
+                    return await node(state)
+                if timeout > 0:
+                    try:
+                        return await asyncio.wait_for(node(state), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except StructuredOutputError as e:
+                print(f"{name}: unusable model output, serving the fallback: {e}")
+            NODE_DEGRADED.inc(node=name)
+            with mock_fallback():
+                output = await node(state)
+            return {**(output or {}), "degraded_sections": [name]}
+
+        return wrapper
+
+    return decorator
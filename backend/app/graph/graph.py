@@ -1,5 +1,9 @@
-from langgraph.graph import StateGraph, END
+import os
+from langgraph.graph import StateGraph, START, END
 from app.graph.state import TripState
+from app.graph.incremental import incremental
+from app.graph.deadlines import with_deadline
+from app.core.metrics import REVISION_LOOPS, instrumented
 from app.agents.research import research_node
 from app.agents.weather import weather_node
 from app.agents.hotel import hotel_node
@@ -8,6 +12,25 @@ from app.agents.logistics import logistics_node
 from app.agents.activities import activities_node
 from app.agents.planner import planner_node
 
+# "parallel" fans independent agents out concurrently, "serial" keeps the
+# original one-agent-at-a-time chain (useful for latency comparisons).
+GRAPH_MODE = os.getenv("GRAPH_MODE", "parallel")
+
+# State keys read by the nodes that can re-run in the revision loop. A node is
+# skipped when none of these changed since its last run. The hotel agent reads
+# revision_count so a revision always asks it for fresh recommendations.
+NODE_INPUTS = {
+    "hotel": ["spec", "research_notes", "weather_info", "revision_count"],
+    "logistics": ["spec", "research_notes", "weather_info"],
+    "activities": ["spec", "research_notes", "weather_info"],
+    "budget": ["spec", "research_notes", "hotel_recommendations", "logistics_info"],
+    "planner": [
+        "spec", "research_notes", "weather_info", "weather_data", "hotels", "transport_options",
+        "budget", "hotel_recommendations", "budget_breakdown", "logistics_info",
+        "activities_recommendations"
+    ],
+}
+
 
 def router_check(state: TripState) -> str:
     """
@@ -16,7 +39,7 @@ def router_check(state: TripState) -> str:
 
     Returns:
     - "revise_hotel" if plan needs hotel improvement and we haven't hit max revisions
-    - "activities" if plan is acceptable, continue to activities
+    - "finalize" if plan is acceptable, continue to finalize_itinerary
     """
     plan_quality_score = state.get('plan_quality_score', 0)
     revision_count = state.get('revision_count', 0)
@@ -27,11 +50,11 @@ def router_check(state: TripState) -> str:
 
     # If we've reached max revisions, continue regardless of quality
     if revision_count >= MAX_REVISIONS:
-        return "activities"
+        return "finalize"
 
     # If no plan was generated, continue (can't revise nothing)
     if plan is None:
-        return "activities"
+        return "finalize"
 
     # Quality thresholds (matching diagram logic):
     # If final_itinerary status indicates hotel needs revision
@@ -40,7 +63,7 @@ def router_check(state: TripState) -> str:
     # 6-7: Good, acceptable
     # 0-5: Needs improvement (revise hotel)
     if plan_quality_score >= 6:
-        return "activities"
+        return "finalize"
 
     # Plan needs hotel revision
     return "revise_hotel"
@@ -52,6 +75,7 @@ def increment_revision(state: TripState) -> dict:
     This tracks how many times we've tried to improve the hotel recommendations.
     """
     current_count = state.get('revision_count', 0)
+    REVISION_LOOPS.inc()
     return {"revision_count": current_count + 1, "status": "revising_hotel"}
 
 
@@ -67,61 +91,102 @@ def finalize_itinerary(state: TripState) -> dict:
         return {"status": "failed"}
 
 
-def build_graph():
+def build_graph(mode: str | None = None):
     """
-    Builds the LangGraph workflow matching the architecture diagram:
+    Builds the LangGraph workflow matching the architecture diagram.
+
+    Args:
+        mode: "parallel" (default) or "serial". Falls back to the GRAPH_MODE
+              environment variable when not given.
+
+    Serial flow:
+    START → Research → Weather → Hotel → Budget → Logistics → Activities
+         → Planner → Router Check → [revise_hotel OR finalize]
+         → finalize_itinerary → END
 
-    Flow:
-    START → Research → Weather → Hotel → Budget → Logistics → Planner
-         → Router Check → [revise_hotel OR activities]
-         → Activities → finalize_itinerary → END
+    Parallel flow (fan-out / fan-in):
+    START → Research ┐         ┌→ Hotel     ┐
+          → Weather  ┴─ join ─┼→ Logistics ┴─ join → Budget ┐
+                               └→ Activities ───────────────┴─ join → Planner → ...
 
     Revision Loop:
     If Router Check returns "revise_hotel":
-        Planner → increment_revision → Hotel → Budget → Logistics → Planner
+        serial:   Planner → increment_revision → Hotel → Budget → Logistics → Activities → Planner
+        parallel: Planner → increment_revision → [Hotel, Logistics, Activities] → Budget → Planner
+    Activities and Logistics don't read the hotels, so in the loop they skip
+    straight to their earlier output.
     """
+    mode = (mode or GRAPH_MODE).lower()
+    if mode not in ("parallel", "serial"):
+        raise ValueError(f"Unknown graph mode '{mode}', expected 'parallel' or 'serial'")
+
     workflow = StateGraph(TripState)
 
-    # Add all agent nodes
-    workflow.add_node("research", research_node)
-    workflow.add_node("weather", weather_node)
-    workflow.add_node("hotel", hotel_node)
-    workflow.add_node("budget", budget_node)
-    workflow.add_node("logistics", logistics_node)
-    workflow.add_node("activities", activities_node)
-    workflow.add_node("planner", planner_node)
-    workflow.add_node("increment_revision", increment_revision)
-    workflow.add_node("finalize_itinerary", finalize_itinerary)
+    # Agents fall back to their mock output when they overrun their share of
+    # the run's latency budget (PLAN_DEADLINE_SECONDS)
+    nodes = {
+        "research": with_deadline("research")(research_node),
+        "weather": with_deadline("weather")(weather_node),
+        "hotel": incremental("hotel", NODE_INPUTS["hotel"])(with_deadline("hotel")(hotel_node)),
+        "budget": incremental("budget", NODE_INPUTS["budget"])(with_deadline("budget")(budget_node)),
+        "logistics": incremental("logistics", NODE_INPUTS["logistics"])(with_deadline("logistics")(logistics_node)),
+        "activities": incremental("activities", NODE_INPUTS["activities"])(with_deadline("activities")(activities_node)),
+        "planner": incremental("planner", NODE_INPUTS["planner"])(with_deadline("planner")(planner_node)),
+        "increment_revision": increment_revision,
+        "finalize_itinerary": finalize_itinerary,
+    }
+    # Add all nodes, each timed for the /metrics endpoint
+    for name, node in nodes.items():
+        workflow.add_node(name, instrumented(name)(node))
 
     # Define workflow edges matching the diagram
-
-    # Entry point: Start with Research Agent
-    workflow.set_entry_point("research")
-
-    # Sequential flow through agents (as shown in diagram)
-    workflow.add_edge("research", "weather")
-    workflow.add_edge("weather", "hotel")
-    workflow.add_edge("hotel", "budget")
-    workflow.add_edge("budget", "logistics")
-    workflow.add_edge("logistics", "planner")
+    if mode == "serial":
+        # Entry point: Start with Research Agent
+        workflow.set_entry_point("research")
+
+        # Sequential flow through agents (as shown in diagram)
+        workflow.add_edge("research", "weather")
+        workflow.add_edge("weather", "hotel")
+        workflow.add_edge("hotel", "budget")
+        workflow.add_edge("budget", "logistics")
+        workflow.add_edge("logistics", "activities")
+        workflow.add_edge("activities", "planner")
+
+        # Revision loop: increment → hotel → budget → logistics → activities → planner
+        workflow.add_edge("increment_revision", "hotel")
+    else:
+        # Research and Weather only need the spec, so they start together
+        workflow.add_edge(START, "research")
+        workflow.add_edge(START, "weather")
+
+        # Hotel, Logistics and Activities only read research/weather: wait for both, then fan out
+        workflow.add_edge(["research", "weather"], "hotel")
+        workflow.add_edge(["research", "weather"], "logistics")
+        workflow.add_edge(["research", "weather"], "activities")
+
+        # Budget reads hotel and logistics output, so it joins both branches
+        workflow.add_edge(["hotel", "logistics"], "budget")
+        # The planner needs the budget and the activities, which ran alongside
+        workflow.add_edge(["budget", "activities"], "planner")
+
+        # Revision loop: increment → [hotel, logistics, activities] → budget → planner.
+        # Logistics and Activities are re-triggered so the joins see every branch
+        # again; their inputs are unchanged, so they return immediately without re-running.
+        workflow.add_edge("increment_revision", "hotel")
+        workflow.add_edge("increment_revision", "logistics")
+        workflow.add_edge("increment_revision", "activities")
 
     # Router Check: Conditional edge after Planner
-    # Decision: Continue to Activities OR Revise Hotel
+    # Decision: Finalize OR Revise Hotel
     workflow.add_conditional_edges(
         "planner",
         router_check,
         {
             "revise_hotel": "increment_revision",  # Loop back for hotel improvement
-            "activities": "activities"  # Plan is good, continue to activities
+            "finalize": "finalize_itinerary"  # Plan is good, finalize it
         }
     )
 
-    # Revision loop: increment → hotel → budget → logistics → planner
-    workflow.add_edge("increment_revision", "hotel")
-
-    # After Activities, finalize the itinerary
-    workflow.add_edge("activities", "finalize_itinerary")
-
     # End after finalization
     workflow.add_edge("finalize_itinerary", END)
 
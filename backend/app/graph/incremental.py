@@ -0,0 +1,57 @@
+"""
+Dependency tracking for nodes that can re-run inside the revision loop.
+
+Each wrapped node declares the state keys it reads. Before running, the
+wrapper fingerprints those values; if they match the fingerprint recorded on
+the node's previous run, the node is skipped and its earlier output (still in
+the state) is reused. Web searches of nodes that do re-run are served from
+the shared search cache.
+"""
+import hashlib
+import json
+from functools import wraps
+from typing import Any, Dict, Iterable
+
+from app.core.metrics import NODE_SKIPS
+
+
+def merge_dicts(left: Dict[str, Any], right: Dict[str, Any]) -> Dict[str, Any]:
+    """State reducer so parallel nodes can each record their own fingerprint."""
+    return {**(left or {}), **(right or {})}
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json")
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _jsonable(v) for k, v in value.items()}
+    return value
+
+
+def state_fingerprint(state: Dict[str, Any], keys: Iterable[str]) -> str:
+    payload = json.dumps({key: _jsonable(state.get(key)) for key in keys}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def incremental(name: str, reads: Iterable[str]):
+    """
+    Decorator for a graph node that only re-executes when one of the state
+    keys in `reads` changed since its last run.
+    """
+    reads = tuple(reads)
+
+    def decorator(node):
+        @wraps(node)
+        async def wrapper(state):
+            fingerprint = state_fingerprint(state, reads)
+            if (state.get("node_fingerprints") or {}).get(name) == fingerprint:
+                NODE_SKIPS.inc(node=name)
+                return {}
+            output = await node(state)
+            return {**(output or {}), "node_fingerprints": {name: fingerprint}}
+
+        return wrapper
+
+    return decorator
@@ -1,8 +1,12 @@
-from typing import TypedDict, List, Annotated, Optional
+from typing import TypedDict, List, Dict, Annotated, Optional
 import operator
 from langchain_core.messages import BaseMessage
 from app.schemas.requests import TripSpec
-from app.schemas.itinerary import TripPlan
+from app.schemas.itinerary import (
+    TripPlan, WeatherData, AccommodationOption, TransportOption, BudgetBreakdown
+)
+from app.graph.incremental import merge_dicts
+from app.graph.deadlines import merge_sections, run_deadline
 
 class TripState(TypedDict):
     spec: TripSpec
@@ -10,10 +14,43 @@ class TripState(TypedDict):
     messages: Annotated[List[BaseMessage], operator.add]
     research_notes: str
     weather_info: str
+    weather_data: List[WeatherData]
     hotel_recommendations: str
     budget_breakdown: str
     logistics_info: str
+    # Typed agent outputs (the *_recommendations/_info strings are their text renderings)
+    hotels: List[AccommodationOption]
+    transport_options: List[TransportOption]
+    budget: Optional[BudgetBreakdown]
     activities_recommendations: str
     revision_count: int
     status: str
     plan_quality_score: int
+    node_fingerprints: Annotated[Dict[str, str], merge_dicts]
+    # time.monotonic() by which the run should finish (None: no deadline)
+    deadline_at: Optional[float]
+    # Nodes that missed their deadline and served mock output instead
+    degraded_sections: Annotated[List[str], merge_sections]
+
+
+def initial_state(spec: TripSpec) -> dict:
+    """Empty graph input for a new trip run."""
+    return {
+        "spec": spec,
+        "revision_count": 0,
+        "research_notes": "",
+        "weather_info": "",
+        "weather_data": [],
+        "hotel_recommendations": "",
+        "budget_breakdown": "",
+        "logistics_info": "",
+        "hotels": [],
+        "transport_options": [],
+        "budget": None,
+        "activities_recommendations": "",
+        "plan_quality_score": 0,
+        "node_fingerprints": {},
+        "deadline_at": run_deadline(),
+        "degraded_sections": [],
+        "messages": []
+    }
@@ -0,0 +1,38 @@
+from typing import List
+from pydantic import BaseModel, Field
+from app.schemas.itinerary import AccommodationOption, TransportOption, BudgetBreakdown
+
+class HotelShortlist(BaseModel):
+    """Structured output of the Hotel Agent."""
+    hotels: List[AccommodationOption]
+
+class LogisticsPlan(BaseModel):
+    """Structured output of the Logistics Agent."""
+    options: List[TransportOption] = Field(..., description="Flights, trains, buses or cabs to and from the destination")
+    notes: List[str] = Field(default=[], description="Arrival, local transport and routing advice")
+
+class BudgetEstimate(BaseModel):
+    """
+    Structured output of the Budget Agent: per-category USD totals for the whole
+    party. The overall total is computed locally, not by the LLM.
+    """
+    flights: float
+    accommodation: float
+    activities: float = Field(..., description="Activities, experiences and miscellaneous costs")
+    food: float
+    transport_local: float
+    currency: str = "USD"
+    notes: List[str] = Field(default=[], description="Calculation basis and cost-saving tips")
+
+    def to_breakdown(self) -> BudgetBreakdown:
+        return BudgetBreakdown(
+            flights=self.flights,
+            accommodation=self.accommodation,
+            activities=self.activities,
+            food=self.food,
+            transport_local=self.transport_local,
+            total_estimated=round(
+                self.flights + self.accommodation + self.activities + self.food + self.transport_local, 2
+            ),
+            currency=self.currency,
+        )
@@ -6,6 +6,10 @@ class WeatherData(BaseModel):
     temperature_c: float
     condition: str
     precip_prob: int
+    temperature_min_c: Optional[float] = None
+    temperature_max_c: Optional[float] = None
+    precip_mm: Optional[float] = None
+    wind_kmh: Optional[float] = None
 
 class Activity(BaseModel):
     name: str
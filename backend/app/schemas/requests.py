@@ -10,6 +10,7 @@ class TripSpec(BaseModel):
     interests: List[str] = []
     constraints: List[str] = []
     travel_style: str = Field(..., description="pleasure, work, business, cultural, adventure")
+    force_refresh: bool = Field(False, description="Skip the plan cache and run the full graph")
 
     class Config:
         json_schema_extra = {
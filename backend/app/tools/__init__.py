@@ -1,4 +1,6 @@
-from .web_search import web_search_tool
-from .weather import WeatherTool
+from .web_search import web_search_tool, async_web_search, search_all, search_cache
+from .search_ranking import build_search_context, rank_results
+from .gazetteer import Gazetteer, Place, resolve_place
+from .weather import WeatherTool, AsyncWeatherClient, weather_client
 
-__all__ = ["web_search_tool", "WeatherTool"]
+__all__ = ["web_search_tool", "async_web_search", "search_all", "search_cache", "build_search_context", "rank_results", "Gazetteer", "Place", "resolve_place", "WeatherTool", "AsyncWeatherClient", "weather_client"]
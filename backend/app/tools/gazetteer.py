@@ -0,0 +1,248 @@
+"""
+Offline gazetteer for resolving destination strings to coordinates.
+
+Places are loaded from a GeoNames `cities*.txt`-style TSV (geonameid, name,
+asciiname, alternatenames, latitude, longitude, ..., country code, cc2,
+admin1 code, ..., population, ...). A small
+seed file ships in `app/data/cities.tsv`; point GAZETTEER_PATH at a full
+GeoNames dump (e.g. cities500.txt, ~200k places) for world-wide coverage.
+
+Every name and alternate name is normalized and kept in one sorted array, so
+exact, alias and prefix lookups are binary searches. Fuzzy matching only
+compares against names with the same first letter and a similar length.
+A qualifier after a comma ("Austin, TX", "London, UK", "Toronto, ON") is
+matched against country and admin1 (state/province) codes.
+Lookups return None when nothing matches; there is no silent default.
+"""
+import bisect
+import difflib
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_GAZETTEER_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "cities.tsv")
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", DEFAULT_GAZETTEER_PATH)
+
+# Fuzzy matches below this similarity ratio are treated as "not found"
+FUZZY_CUTOFF = 0.82
+# Shorter queries only match exactly ("la", "rome"), never fuzzily
+MIN_PARTIAL_MATCH_LENGTH = 5
+# Shorter queries never match by prefix ("port" is not Portland)
+MIN_PREFIX_MATCH_LENGTH = 6
+# Resolved lookups kept per Gazetteer
+LOOKUP_CACHE_SIZE = 4096
+
+# Common qualifiers that aren't the ISO country code
+COUNTRY_ALIASES = {"uk": "gb", "usa": "us"}
+# GeoNames numbers some countries' admin1 regions; users write the postal abbreviation
+ADMIN1_ABBREVIATIONS = {
+    "CA": {"01": "ab", "02": "bc", "03": "mb", "04": "nb", "05": "nl", "07": "ns", "08": "on",
+           "09": "pe", "10": "qc", "11": "sk", "12": "yt", "13": "nt", "14": "nu"},
+    "AU": {"01": "act", "02": "nsw", "03": "nt", "04": "qld", "05": "sa", "06": "tas", "07": "vic", "08": "wa"},
+}
+
+
+@dataclass(frozen=True)
+class Place:
+    name: str
+    country_code: str
+    latitude: float
+    longitude: float
+    population: int
+    match: str = "exact"  # exact | alias | prefix | fuzzy
+
+    @property
+    def coordinates(self) -> Tuple[float, float]:
+        return (self.latitude, self.longitude)
+
+    @property
+    def display_name(self) -> str:
+        return f"{self.name}, {self.country_code}" if self.country_code else self.name
+
+
+def normalize_place_name(name: str) -> str:
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    text = unicodedata.normalize("NFKD", name)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class Gazetteer:
+    """Sorted-array index over place names and aliases."""
+
+    def __init__(self, path: str = GAZETTEER_PATH):
+        # Per-place columns (parallel arrays keep 100k+ places compact)
+        self._place_names: List[str] = []
+        self._country_codes: List[str] = []
+        self._admin1_codes: List[str] = []  # lowercase, abbreviated where GeoNames numbers them
+        self._latitudes = array("d")
+        self._longitudes = array("d")
+        self._populations = array("q")
+        # Sorted normalized names with the place index and whether it's an alias
+        self._keys: List[str] = []
+        self._key_places = array("l")
+        self._key_is_alias = array("b")
+        # (first letter) -> sorted distinct keys, for fuzzy candidates
+        self._buckets: Dict[str, List[str]] = {}
+        # Every country and admin1 code in the index, lowercase
+        self._region_codes: set[str] = set()
+        # query -> resolved place (or None), oldest first
+        self._lookups: Dict[str, Optional[Place]] = {}
+        self._lookups_lock = threading.Lock()
+        self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._place_names)
+
+    def _load(self, path: str) -> None:
+        entries: List[Tuple[str, int, int]] = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                cols = line.rstrip("\n").split("\t")
+                if len(cols) < 15:
+                    continue
+                index = len(self._place_names)
+                self._place_names.append(cols[1])
+                self._country_codes.append(cols[8])
+                admin1 = ADMIN1_ABBREVIATIONS.get(cols[8], {}).get(cols[10], cols[10]).lower()
+                self._admin1_codes.append(admin1)
+                self._region_codes.update(code for code in (cols[8].lower(), admin1) if code)
+                self._latitudes.append(float(cols[4]))
+                self._longitudes.append(float(cols[5]))
+                self._populations.append(int(cols[14] or 0))
+
+                primary = {normalize_place_name(cols[1]), normalize_place_name(cols[2])}
+                for key in primary:
+                    entries.append((key, 0, index))
+                for alias in cols[3].split(","):
+                    key = normalize_place_name(alias)
+                    if key and key not in primary:
+                        entries.append((key, 1, index))
+
+        entries.sort()
+        for key, is_alias, index in entries:
+            self._keys.append(key)
+            self._key_is_alias.append(is_alias)
+            self._key_places.append(index)
+        for key in dict.fromkeys(self._keys):
+            self._buckets.setdefault(key[:1], []).append(key)
+
+    def _place(self, index: int, match: str) -> Place:
+        return Place(
+            name=self._place_names[index],
+            country_code=self._country_codes[index],
+            latitude=self._latitudes[index],
+            longitude=self._longitudes[index],
+            population=self._populations[index],
+            match=match,
+        )
+
+    def _in_regions(self, index: int, regions: Tuple[str, ...]) -> bool:
+        codes = (self._country_codes[index].lower(), self._admin1_codes[index])
+        return all(region in codes for region in regions)
+
+    def _best(self, lo: int, hi: int, regions: Tuple[str, ...]) -> Optional[Tuple[int, bool]]:
+        """Most populous place among key positions [lo, hi), optionally within country/admin1 codes."""
+        best = None
+        for pos in range(lo, hi):
+            index = self._key_places[pos]
+            if regions and not self._in_regions(index, regions):
+                continue
+            # Prefer primary names over aliases, then population
+            rank = (not self._key_is_alias[pos], self._populations[index])
+            if best is None or rank > best[0]:
+                best = (rank, index, bool(self._key_is_alias[pos]))
+        return None if best is None else (best[1], best[2])
+
+    def _exact(self, key: str, regions: Tuple[str, ...]) -> Optional[Place]:
+        lo = bisect.bisect_left(self._keys, key)
+        hi = bisect.bisect_right(self._keys, key, lo)
+        found = self._best(lo, hi, regions)
+        if found is None:
+            return None
+        index, is_alias = found
+        return self._place(index, "alias" if is_alias else "exact")
+
+    def _prefix(self, key: str, regions: Tuple[str, ...]) -> Optional[Place]:
+        lo = bisect.bisect_left(self._keys, key)
+        # "\uffff" sorts after every character we keep after normalization
+        hi = bisect.bisect_right(self._keys, key + "\uffff", lo)
+        found = self._best(lo, hi, regions)
+        return None if found is None else self._place(found[0], "prefix")
+
+    def _fuzzy(self, key: str, regions: Tuple[str, ...]) -> Optional[Place]:
+        candidates = [k for k in self._buckets.get(key[:1], ()) if abs(len(k) - len(key)) <= 2]
+        for match in difflib.get_close_matches(key, candidates, n=3, cutoff=FUZZY_CUTOFF):
+            place = self._exact(match, regions)
+            if place is not None:
+                return replace(place, match="fuzzy")
+        return None
+
+    def lookup(self, query: str) -> Optional[Place]:
+        """
+        Resolves a free-text destination ("Paris", "paris, fr", "Austin, TX",
+        "NYC", "Muenchen", "Barcelna") to the best matching place, trying exact
+        name, alias, prefix and finally fuzzy matches. Returns None if nothing
+        fits. When no place matches the qualifier, the best unqualified match
+        is returned instead.
+        """
+        with self._lookups_lock:
+            if query in self._lookups:
+                return self._lookups[query]
+        place = self._resolve(query)
+        with self._lookups_lock:
+            self._lookups[query] = place
+            while len(self._lookups) > LOOKUP_CACHE_SIZE:
+                del self._lookups[next(iter(self._lookups))]
+        return place
+
+    def _resolve(self, query: str) -> Optional[Place]:
+        name, *qualifiers = query.split(",")
+        key = normalize_place_name(name)
+        if not key:
+            return None
+        # Qualifiers that are country or admin1 codes narrow the match; others are ignored
+        regions = tuple(
+            region for region in (COUNTRY_ALIASES.get(q, q) for q in map(normalize_place_name, qualifiers))
+            if region in self._region_codes
+        )
+        if regions:
+            place = self._match(key, regions)
+            if place is not None:
+                return place
+        return self._match(key, ())
+
+    def _match(self, key: str, regions: Tuple[str, ...]) -> Optional[Place]:
+        strategies = [self._exact]
+        if len(key) >= MIN_PREFIX_MATCH_LENGTH:
+            strategies.append(self._prefix)
+        if len(key) >= MIN_PARTIAL_MATCH_LENGTH:
+            strategies.append(self._fuzzy)
+        for strategy in strategies:
+            place = strategy(key, regions)
+            if place is not None:
+                return place
+        return None
+
+
+_gazetteer: Optional[Gazetteer] = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+def resolve_place(name: str) -> Optional[Place]:
+    return get_gazetteer().lookup(name)
+
@@ -1,6 +1,60 @@
+import asyncio
+import os
 import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import date, timedelta
 from typing import List
-from app.schemas.itinerary import AccommodationOption, TransportOption
+from app.core.cassettes import replaying
+from app.schemas.itinerary import AccommodationOption, TransportOption, WeatherData
+
+# Artificial latency for the mock code paths, so offline runs (see benchmarks/)
+# can approximate real search and Vertex round-trips. Zero by default.
+MOCK_LATENCY_MS = {
+    "search": float(os.getenv("MOCK_SEARCH_LATENCY_MS", "0")),
+    "llm": float(os.getenv("MOCK_LLM_LATENCY_MS", "0")),
+    "weather": float(os.getenv("MOCK_WEATHER_LATENCY_MS", "0")),
+}
+# Serve synthetic forecasts instead of calling Open-Meteo
+MOCK_WEATHER = os.getenv("MOCK_WEATHER", "false").lower() in ("1", "true", "yes")
+
+# Set while a node that missed its deadline re-runs for its fallback output
+_fallback: ContextVar[bool] = ContextVar("mock_fallback", default=False)
+
+
+@contextmanager
+def mock_fallback():
+    """Within the block agents take their mock paths, without artificial latency."""
+    token = _fallback.set(True)
+    try:
+        yield
+    finally:
+        _fallback.reset(token)
+
+
+def in_fallback() -> bool:
+    return _fallback.get()
+
+
+def use_mock_data() -> bool:
+    """
+    Agents serve canned data when Vertex AI isn't configured, unless recorded
+    cassettes are being replayed through their real code paths, and as the
+    fallback of a node that ran out of time.
+    """
+    if _fallback.get():
+        return True
+    return not os.getenv("GOOGLE_CLOUD_PROJECT") and not replaying()
+
+
+async def mock_latency(*kinds: str) -> None:
+    """Sleeps for the configured latency of each call kind ("search", "llm", "weather")."""
+    if _fallback.get():
+        return
+    delay = sum(MOCK_LATENCY_MS.get(kind, 0.0) for kind in kinds)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+
 
 class BookingMocks:
     """
@@ -48,3 +102,27 @@ class BookingMocks:
                 booking_link="https://www.google.com/travel/flights"
             )
         ]
+
+
+class WeatherMocks:
+    """Deterministic synthetic forecasts for offline runs."""
+
+    CONDITIONS = ["Clear sky", "Partly cloudy", "Overcast", "Light rain", "Mainly clear"]
+
+    @staticmethod
+    def daily(start: str, end: str) -> List[WeatherData]:
+        first, last = date.fromisoformat(start), date.fromisoformat(end)
+        days = []
+        for i in range((last - first).days + 1):
+            temp = 18.0 + (i % 5)
+            days.append(WeatherData(
+                date=(first + timedelta(days=i)).isoformat(),
+                temperature_c=temp,
+                temperature_min_c=temp - 5,
+                temperature_max_c=temp + 5,
+                condition=WeatherMocks.CONDITIONS[i % len(WeatherMocks.CONDITIONS)],
+                precip_prob=(i * 15) % 70,
+                precip_mm=0.0,
+                wind_kmh=10.0,
+            ))
+        return days
@@ -0,0 +1,128 @@
+"""
+Relevance ranking of web search results before they are pasted into a prompt.
+
+Agents run several overlapping queries, so the raw result list repeats URLs
+and near-identical snippets and arrives in query order. `build_search_context`
+drops duplicate URLs and near-duplicate snippets, scores what's left with
+BM25 against the agent's intent (its queries plus the traveller's interests),
+and keeps the best results that fit a token budget.
+"""
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+from urllib.parse import urlsplit
+
+from app.core.context_budget import estimate_tokens
+
+SEARCH_CONTEXT_TOKENS = int(os.getenv("SEARCH_CONTEXT_TOKENS", "1500"))
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Snippets sharing at least this fraction of word 3-grams count as duplicates
+NEAR_DUPLICATE_SIMILARITY = 0.7
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "best", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "top", "what", "where", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in _STOPWORDS and len(t) > 1]
+
+
+def normalize_url(url: str) -> str:
+    """Scheme, "www.", query string, fragment and trailing slash don't make a different page."""
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith("www.") else parts.netloc
+    return host + parts.path.rstrip("/")
+
+
+def _shingles(tokens: List[str]) -> set:
+    if len(tokens) < 3:
+        return {tuple(tokens)}
+    return {tuple(tokens[i:i + 3]) for i in range(len(tokens) - 2)}
+
+
+def deduplicate(results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drops repeated URLs and snippets that are near-copies of one already kept."""
+    kept: List[Dict[str, Any]] = []
+    seen_urls = set()
+    kept_shingles: List[set] = []
+    for result in results:
+        url = normalize_url(result.get("url", ""))
+        if url and url in seen_urls:
+            continue
+        shingles = _shingles(tokenize(result.get("snippet", "")))
+        if shingles and any(
+            len(shingles & other) / min(len(shingles), len(other)) >= NEAR_DUPLICATE_SIMILARITY
+            for other in kept_shingles if other
+        ):
+            continue
+        seen_urls.add(url)
+        kept_shingles.append(shingles)
+        kept.append(result)
+    return kept
+
+
+def bm25_scores(documents: List[List[str]], query: List[str]) -> List[float]:
+    """BM25 score of each tokenized document for the query terms (IDF over `documents`)."""
+    if not documents:
+        return []
+    n = len(documents)
+    average_length = sum(len(doc) for doc in documents) / n or 1.0
+    document_frequency = Counter(term for doc in documents for term in set(doc))
+    query_terms = set(query)
+    scores = []
+    for doc in documents:
+        frequencies = Counter(doc)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / average_length)
+        score = 0.0
+        for term in query_terms:
+            tf = frequencies.get(term)
+            if not tf:
+                continue
+            df = document_frequency[term]
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            score += idf * tf * (BM25_K1 + 1) / (tf + length_norm)
+        scores.append(score)
+    return scores
+
+
+def format_result(result: Dict[str, Any]) -> str:
+    return f"**{result['title']}**\n{result['snippet']}\nSource: {result['url']}"
+
+
+def rank_results(results: List[Dict[str, Any]], intent: str) -> List[Dict[str, Any]]:
+    """Unique results ordered by relevance to `intent` (ties keep arrival order)."""
+    unique = deduplicate(results)
+    scores = bm25_scores([tokenize(f"{r['title']} {r['snippet']}") for r in unique], tokenize(intent))
+    order = sorted(range(len(unique)), key=lambda i: -scores[i])
+    return [unique[i] for i in order]
+
+
+def build_search_context(
+    results: List[Dict[str, Any]],
+    intent: str,
+    max_results: int,
+    max_tokens: int = SEARCH_CONTEXT_TOKENS,
+) -> str:
+    """
+    Prompt-ready search context: the most relevant unique results, best
+    first, up to `max_results` of them and roughly `max_tokens` tokens.
+    """
+    blocks: List[str] = []
+    used = 0
+    for result in rank_results(results, intent):
+        block = format_result(result)
+        cost = estimate_tokens(block)
+        if used + cost > max_tokens:
+            continue  # a shorter, lower-ranked result may still fit
+        blocks.append(block)
+        used += cost
+        if len(blocks) >= max_results:
+            break
+    return "\n\n".join(blocks)
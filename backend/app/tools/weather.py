@@ -1,8 +1,31 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
 import openmeteo_requests
 import requests_cache
 from retry_requests import retry
-from typing import Optional, Dict, Any
+import numpy as np
+from statistics import mean
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime, timedelta
+from app.schemas.itinerary import WeatherData
+from app.tools.gazetteer import resolve_place
+
+WEATHER_CACHE_TTL_SECONDS = float(os.getenv("WEATHER_CACHE_TTL_SECONDS", "1800"))
+WEATHER_CACHE_MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "512"))
+
+# Stands in for a day Open-Meteo returned no weather code for
+MISSING_WEATHER_CODE = -1
+
+DAILY_VARIABLES = [
+    "temperature_2m_max",
+    "temperature_2m_min",
+    "precipitation_probability_max",
+    "precipitation_sum",
+    "weathercode",
+    "windspeed_10m_max"
+]
 
 class WeatherTool:
     def __init__(self):
@@ -16,102 +39,157 @@ class WeatherTool:
         Fetches detailed weather forecast for given coords and dates from Open-Meteo API.
         Returns a comprehensive human readable string summary for agent consumption.
         """
+        try:
+            return self.fetch_forecast(latitude, longitude, start_date, end_date)
+        except Exception as e:
+            return self.unavailable_message(latitude, longitude, e)
+
+    def fetch_forecast(self, latitude: float, longitude: float, start_date: str, end_date: str) -> str:
+        """
+        Same as get_forecast, but raises on failure instead of returning the
+        fallback text (so callers can avoid caching failures).
+        """
+        days = self.fetch_daily([(latitude, longitude)], start_date, end_date)[0]
+        return self.render_forecast(days, latitude, longitude, start_date, end_date)
+
+    def fetch_daily(
+        self,
+        locations: List[Tuple[float, float]],
+        start_date: str,
+        end_date: str,
+    ) -> List[List[WeatherData]]:
+        """
+        Fetches daily forecasts for several (latitude, longitude) pairs in a
+        single Open-Meteo request. Returns one list of WeatherData per location,
+        in the same order. Raises on failure.
+        """
         params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "daily": [
-                "temperature_2m_max",
-                "temperature_2m_min",
-                "precipitation_probability_max",
-                "precipitation_sum",
-                "weathercode",
-                "windspeed_10m_max"
-            ],
+            "latitude": [lat for lat, _ in locations],
+            "longitude": [lon for _, lon in locations],
+            "daily": DAILY_VARIABLES,
             "timezone": "auto",
             "start_date": start_date,
             "end_date": end_date
         }
 
-        try:
-            responses = self.openmeteo.weather_api(self.url, params=params)
-            response = responses[0]
-
-            daily = response.Daily()
-
-            # Extract all weather variables
-            temp_max = daily.Variables(0).ValuesAsNumpy()
-            temp_min = daily.Variables(1).ValuesAsNumpy()
-            precip_prob = daily.Variables(2).ValuesAsNumpy()
-            precip_sum = daily.Variables(3).ValuesAsNumpy()
-            weather_codes = daily.Variables(4).ValuesAsNumpy()
-            wind_speed = daily.Variables(5).ValuesAsNumpy()
-
-            # Generate time array for dates
-            dates = []
-            current = datetime.strptime(start_date, "%Y-%m-%d")
-            end = datetime.strptime(end_date, "%Y-%m-%d")
-            while current <= end:
-                dates.append(current.strftime("%Y-%m-%d"))
-                current += timedelta(days=1)
-
-            # Build detailed summary
-            summary = f"\n=== WEATHER FORECAST ({start_date} to {end_date}) ===\n"
-            summary += f"Location: ({latitude:.2f}, {longitude:.2f})\n\n"
-
-            # Daily breakdown
-            for i, date in enumerate(dates):
-                if i < len(temp_max):
-                    condition = self._interpret_weather_code(int(weather_codes[i]))
-                    temp_max_c = temp_max[i]
-                    temp_min_c = temp_min[i]
-                    temp_max_f = (temp_max_c * 9/5) + 32
-                    temp_min_f = (temp_min_c * 9/5) + 32
-
-                    summary += f"📅 {date}:\n"
-                    summary += f"  🌡️  Temp: {temp_min_c:.1f}°C - {temp_max_c:.1f}°C ({temp_min_f:.1f}°F - {temp_max_f:.1f}°F)\n"
-                    summary += f"  ☁️  Condition: {condition}\n"
-                    summary += f"  💧 Precipitation: {precip_prob[i]:.0f}% chance, {precip_sum[i]:.1f}mm expected\n"
-                    summary += f"  💨 Wind: {wind_speed[i]:.1f} km/h\n\n"
-
-            # Overall summary
-            avg_temp_max = temp_max.mean()
-            avg_temp_min = temp_min.mean()
-            avg_precip_prob = precip_prob.mean()
-            total_precip = precip_sum.sum()
-
-            summary += "📊 OVERALL SUMMARY:\n"
-            summary += f"  • Average temperatures: {avg_temp_min:.1f}°C - {avg_temp_max:.1f}°C\n"
-            summary += f"  • Average precipitation chance: {avg_precip_prob:.0f}%\n"
-            summary += f"  • Total expected rainfall: {total_precip:.1f}mm\n"
-
-            # Travel recommendations
-            summary += "\n💡 PACKING RECOMMENDATIONS:\n"
-            if avg_temp_max > 25:
-                summary += "  • Light, breathable clothing\n"
-                summary += "  • Sun protection (hat, sunscreen)\n"
-            elif avg_temp_max > 15:
-                summary += "  • Comfortable layers\n"
-                summary += "  • Light jacket for evenings\n"
-            else:
-                summary += "  • Warm clothing and layers\n"
-                summary += "  • Winter jacket\n"
+        responses = self.openmeteo.weather_api(self.url, params=params)
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        return [self._daily_records(response.Daily(), start) for response in responses]
 
-            if avg_precip_prob > 50:
-                summary += "  • Waterproof jacket or umbrella (high rain chance)\n"
-            elif avg_precip_prob > 30:
-                summary += "  • Light rain gear recommended\n"
+    def _daily_records(self, daily, start: datetime) -> List[WeatherData]:
+        """Turns one location's daily variable arrays into WeatherData records."""
+        # Variables come back in DAILY_VARIABLES order
+        temp_max = daily.Variables(0).ValuesAsNumpy()
+        temp_min = daily.Variables(1).ValuesAsNumpy()
+        precip_prob = np.nan_to_num(daily.Variables(2).ValuesAsNumpy())
+        precip_sum = np.nan_to_num(daily.Variables(3).ValuesAsNumpy())
+        # A missing code is NaN, which can't be cast to int
+        weather_codes = np.nan_to_num(daily.Variables(4).ValuesAsNumpy(), nan=MISSING_WEATHER_CODE).astype(int)
+        wind_speed = daily.Variables(5).ValuesAsNumpy()
 
-            if wind_speed.max() > 30:
-                summary += "  • Windproof outer layer\n"
+        # Whole-array math once, then a single pass to build the records
+        temp_mean = np.round((temp_max + temp_min) / 2, 1)
+        dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(len(temp_max))]
+        return [
+            WeatherData(
+                date=date,
+                temperature_c=float(t_mean),
+                temperature_min_c=round(float(t_min), 1),
+                temperature_max_c=round(float(t_max), 1),
+                condition=self._interpret_weather_code(int(code)),
+                precip_prob=int(prob),
+                precip_mm=round(float(rain), 1),
+                wind_kmh=round(float(wind), 1),
+            )
+            for date, t_mean, t_min, t_max, code, prob, rain, wind in zip(
+                dates, temp_mean.tolist(), temp_min.tolist(), temp_max.tolist(),
+                weather_codes.tolist(), precip_prob.tolist(), precip_sum.tolist(), wind_speed.tolist(),
+                strict=True,
+            )
+        ]
 
-            return summary
+    @staticmethod
+    def render_forecast(days: List[WeatherData], latitude: float, longitude: float,
+                        start_date: str, end_date: str) -> str:
+        """
+        Renders WeatherData records as the detailed, human readable summary
+        agents have always received.
+        """
+        lines = [
+            "",
+            f"=== WEATHER FORECAST ({start_date} to {end_date}) ===",
+            f"Location: ({latitude:.2f}, {longitude:.2f})",
+            "",
+        ]
 
-        except Exception as e:
-            # Fallback with helpful error message
-            return f"""
+        # Daily breakdown
+        for day in days:
+            temp_min_c = day.temperature_min_c if day.temperature_min_c is not None else day.temperature_c
+            temp_max_c = day.temperature_max_c if day.temperature_max_c is not None else day.temperature_c
+            temp_max_f = (temp_max_c * 9/5) + 32
+            temp_min_f = (temp_min_c * 9/5) + 32
+            lines += [
+                f"📅 {day.date}:",
+                f"  🌡️  Temp: {temp_min_c:.1f}°C - {temp_max_c:.1f}°C ({temp_min_f:.1f}°F - {temp_max_f:.1f}°F)",
+                f"  ☁️  Condition: {day.condition}",
+                f"  💧 Precipitation: {day.precip_prob:.0f}% chance, {day.precip_mm or 0:.1f}mm expected",
+                f"  💨 Wind: {day.wind_kmh or 0:.1f} km/h",
+                "",
+            ]
+
+        if not days:
+            return "\n".join(lines) + "\n"
+
+        # Overall summary
+        avg_temp_max = mean(d.temperature_max_c if d.temperature_max_c is not None else d.temperature_c for d in days)
+        avg_temp_min = mean(d.temperature_min_c if d.temperature_min_c is not None else d.temperature_c for d in days)
+        avg_precip_prob = mean(d.precip_prob for d in days)
+        total_precip = sum(d.precip_mm or 0 for d in days)
+        max_wind = max(d.wind_kmh or 0 for d in days)
+
+        lines += [
+            "📊 OVERALL SUMMARY:",
+            f"  • Average temperatures: {avg_temp_min:.1f}°C - {avg_temp_max:.1f}°C",
+            f"  • Average precipitation chance: {avg_precip_prob:.0f}%",
+            f"  • Total expected rainfall: {total_precip:.1f}mm",
+        ]
+
+        # Travel recommendations
+        lines += ["", "💡 PACKING RECOMMENDATIONS:"]
+        if avg_temp_max > 25:
+            lines += ["  • Light, breathable clothing", "  • Sun protection (hat, sunscreen)"]
+        elif avg_temp_max > 15:
+            lines += ["  • Comfortable layers", "  • Light jacket for evenings"]
+        else:
+            lines += ["  • Warm clothing and layers", "  • Winter jacket"]
+
+        if avg_precip_prob > 50:
+            lines.append("  • Waterproof jacket or umbrella (high rain chance)")
+        elif avg_precip_prob > 30:
+            lines.append("  • Light rain gear recommended")
+
+        if max_wind > 30:
+            lines.append("  • Windproof outer layer")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def render_compact(days: List[WeatherData]) -> str:
+        """One short line per day, for prompts that only need the facts."""
+        return "\n".join(
+            f"{d.date}: {d.temperature_min_c if d.temperature_min_c is not None else d.temperature_c:.0f}-"
+            f"{d.temperature_max_c if d.temperature_max_c is not None else d.temperature_c:.0f}°C, "
+            f"{d.condition}, {d.precip_prob}% rain"
+            for d in days
+        )
+
+    @staticmethod
+    def unavailable_message(latitude: float, longitude: float, error: Exception) -> str:
+        """Fallback summary used when the forecast can't be fetched."""
+        return f"""
 === WEATHER FORECAST UNAVAILABLE ===
 Could not fetch weather data for ({latitude:.2f}, {longitude:.2f})
-Error: {str(e)}
+Error: {str(error)}
 
 Please check:
 1. Internet connection
@@ -130,6 +208,7 @@ Using general recommendations:
         https://open-meteo.com/en/docs
         """
         weather_codes = {
+            MISSING_WEATHER_CODE: "Unknown",
             0: "Clear sky",
             1: "Mainly clear",
             2: "Partly cloudy",
@@ -158,77 +237,130 @@ Using general recommendations:
         return weather_codes.get(code, f"Unknown condition (code {code})")
 
     @staticmethod
-    def get_city_coordinates(city: str) -> tuple[float, float]:
+    def get_city_coordinates(city: str) -> Optional[tuple[float, float]]:
         """
-        Returns approximate coordinates for common cities.
-        In production, use a geocoding API like Nominatim or Google Geocoding.
+        Returns coordinates for a city from the offline gazetteer (exact, alias,
+        prefix or fuzzy match), or None if the city can't be resolved.
         """
-        city_coords = {
-            "new york": (40.7128, -74.0060),
-            "nyc": (40.7128, -74.0060),
-            "london": (51.5074, -0.1278),
-            "paris": (48.8566, 2.3522),
-            "tokyo": (35.6762, 139.6503),
-            "sydney": (-33.8688, 151.2093),
-            "dubai": (25.2048, 55.2708),
-            "singapore": (1.3521, 103.8198),
-            "barcelona": (41.3874, 2.1686),
-            "rome": (41.9028, 12.4964),
-            "berlin": (52.5200, 13.4050),
-            "amsterdam": (52.3676, 4.9041),
-            "madrid": (40.4168, -3.7038),
-            "vienna": (48.2082, 16.3738),
-            "prague": (50.0755, 14.4378),
-            "istanbul": (41.0082, 28.9784),
-            "athens": (37.9838, 23.7275),
-            "los angeles": (34.0522, -118.2437),
-            "la": (34.0522, -118.2437),
-            "san francisco": (37.7749, -122.4194),
-            "chicago": (41.8781, -87.6298),
-            "miami": (25.7617, -80.1918),
-            "seattle": (47.6062, -122.3321),
-            "boston": (42.3601, -71.0589),
-            "washington": (38.9072, -77.0369),
-            "toronto": (43.6532, -79.3832),
-            "vancouver": (49.2827, -123.1207),
-            "mexico city": (19.4326, -99.1332),
-            "rio de janeiro": (22.9068, -43.1729),
-            "sao paulo": (-23.5505, -46.6333),
-            "buenos aires": (-34.6037, -58.3816),
-            "cairo": (30.0444, 31.2357),
-            "johannesburg": (-26.2041, 28.0473),
-            "mumbai": (19.0760, 72.8777),
-            "delhi": (28.7041, 77.1025),
-            "bangalore": (12.9716, 77.5946),
-            "bangkok": (13.7563, 100.5018),
-            "seoul": (37.5665, 126.9780),
-            "beijing": (39.9042, 116.4074),
-            "shanghai": (31.2304, 121.4737),
-            "hong kong": (22.3193, 114.1694),
-            "melbourne": (-37.8136, 144.9631),
-            "auckland": (-36.8485, 174.7633),
-            "lisbon": (38.7223, -9.1393),
-            "dublin": (53.3498, -6.2603),
-            "copenhagen": (55.6761, 12.5683),
-            "stockholm": (59.3293, 18.0686),
-            "oslo": (59.9139, 10.7522),
-            "helsinki": (60.1699, 24.9384),
-            "warsaw": (52.2297, 21.0122),
-            "budapest": (47.4979, 19.0402),
-            "zurich": (47.3769, 8.5417),
-            "geneva": (46.2044, 6.1432),
-            "brussels": (50.8503, 4.3517),
-            "kyoto": (35.0116, 135.7681),
-            "osaka": (34.6937, 135.5023),
-        }
+        place = resolve_place(city)
+        return place.coordinates if place is not None else None
+
+
+class AsyncWeatherClient:
+    """
+    Long-lived, non-blocking front end for WeatherTool.
+
+    A single WeatherTool (and its on-disk requests_cache session) is shared by
+    every request. Successful forecasts are kept as WeatherData records in an
+    in-memory TTL/LRU cache keyed by rounded coordinates and date range, and
+    concurrent requests for the same key share one in-flight fetch. Cache
+    misses in a batch lookup are fetched with a single Open-Meteo request.
+    """
+
+    def __init__(self, ttl_seconds: float = WEATHER_CACHE_TTL_SECONDS,
+                 max_entries: int = WEATHER_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._tool: Optional[WeatherTool] = None
+        self._cache: "OrderedDict[tuple, tuple[float, List[WeatherData]]]" = OrderedDict()
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+
+    @property
+    def tool(self) -> WeatherTool:
+        # Created on first use so importing this module doesn't open the cache file
+        if self._tool is None:
+            self._tool = WeatherTool()
+        return self._tool
+
+    @staticmethod
+    def cache_key(latitude: float, longitude: float, start_date: str, end_date: str) -> tuple:
+        # ~1km precision: nearby lookups for the same city share an entry
+        return (round(latitude, 2), round(longitude, 2), start_date, end_date)
+
+    async def get_daily(self, latitude: float, longitude: float, start_date: str, end_date: str) -> List[WeatherData]:
+        """Daily WeatherData for one location. Raises if the forecast can't be fetched."""
+        return (await self.get_daily_many([(latitude, longitude)], start_date, end_date))[0]
+
+    async def get_daily_many(
+        self,
+        locations: List[Tuple[float, float]],
+        start_date: str,
+        end_date: str,
+    ) -> List[List[WeatherData]]:
+        """
+        Daily WeatherData for several locations (multi-city trips, cache
+        warming). Cached and in-flight locations are reused; the rest are
+        fetched together in one request. Raises if any fetch fails.
+        """
+        keys = [self.cache_key(lat, lon, start_date, end_date) for lat, lon in locations]
+        pending: Dict[tuple, asyncio.Future] = {}
+        found: Dict[tuple, List[WeatherData]] = {}
+        missing: Dict[tuple, Tuple[float, float]] = {}
+
+        for key, location in zip(keys, locations, strict=True):
+            if key in found or key in pending or key in missing:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                found[key] = cached
+            elif key in self._inflight:
+                pending[key] = self._inflight[key]
+            else:
+                missing[key] = location
+
+        if missing:
+            batch = asyncio.create_task(self._fetch_batch(list(missing.items()), start_date, end_date))
+            for index, key in enumerate(missing):
+                future = asyncio.ensure_future(self._pick(batch, index))
+                self._inflight[key] = future
+                future.add_done_callback(lambda _, key=key: self._inflight.pop(key, None))
+                pending[key] = future
+
+        for key, future in pending.items():
+            # shield: one cancelled caller must not cancel a fetch others are waiting on
+            found[key] = await asyncio.shield(future)
+
+        return [found[key] for key in keys]
+
+    async def get_forecast(self, latitude: float, longitude: float, start_date: str, end_date: str) -> str:
+        """Rendered forecast text, or the fallback text if it can't be fetched."""
+        try:
+            days = await self.get_daily(latitude, longitude, start_date, end_date)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            return WeatherTool.unavailable_message(latitude, longitude, e)
+        return WeatherTool.render_forecast(days, latitude, longitude, start_date, end_date)
+
+    def _cache_get(self, key: tuple) -> Optional[List[WeatherData]]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return entry[1]
+
+    @staticmethod
+    async def _pick(batch: asyncio.Task, index: int) -> List[WeatherData]:
+        return (await asyncio.shield(batch))[index]
 
-        # Try exact match first, then case-insensitive
-        city_lower = city.lower().strip()
-        coords = city_coords.get(city_lower)
+    async def _fetch_batch(
+        self,
+        items: List[Tuple[tuple, Tuple[float, float]]],
+        start_date: str,
+        end_date: str,
+    ) -> List[List[WeatherData]]:
+        locations = [location for _, location in items]
+        results = await asyncio.to_thread(self.tool.fetch_daily, locations, start_date, end_date)
+        expires = time.monotonic() + self.ttl_seconds
+        for (key, _), days in zip(items, results, strict=True):
+            self._cache[key] = (expires, days)
+            self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        return results
 
-        if coords:
-            return coords
 
-        # If not found, return NYC as default (could be improved with actual geocoding API)
-        print(f"Warning: City '{city}' not found in database, using default coordinates")
-        return (40.7128, -74.0060)  # Default to NYC
+weather_client = AsyncWeatherClient()
@@ -1,5 +1,213 @@
+import asyncio
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from langchain_core.tools import tool
 from typing import List, Dict, Any
+from app.core import metrics
+from app.core.cassettes import recording, replaying, search_cassette
+from app.core.metrics import SEARCH_ATTEMPTS, SEARCH_CALLS, SEARCH_DURATION
+from app.core.resilience import CircuitBreaker, LatencyWindow
+
+# DuckDuckGo's client is synchronous, so searches run on a dedicated, bounded
+# thread pool instead of the event loop.
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "8"))
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("SEARCH_TIMEOUT_SECONDS", "10"))
+
+_search_executor = ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="web-search")
+
+# A query still unanswered after the recent p95 latency gets a duplicate
+# request (the hedge); a failed attempt is retried at once. Attempts per query,
+# including the first; 1 disables both.
+SEARCH_MAX_ATTEMPTS = int(os.getenv("SEARCH_MAX_ATTEMPTS", "3"))
+# Hedge delay until enough latencies have been seen to estimate the p95
+SEARCH_HEDGE_DEFAULT_SECONDS = float(os.getenv("SEARCH_HEDGE_DEFAULT_SECONDS", "2.0"))
+SEARCH_HEDGE_MIN_SECONDS = 0.1
+# After this many consecutive failures searches are skipped for the cooldown
+SEARCH_BREAKER_FAILURES = int(os.getenv("SEARCH_BREAKER_FAILURES", "5"))
+SEARCH_BREAKER_COOLDOWN_SECONDS = float(os.getenv("SEARCH_BREAKER_COOLDOWN_SECONDS", "30"))
+
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "21600"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2048"))
+
+_STOPWORDS = {"a", "an", "the", "in", "of", "for", "to", "and", "on", "at"}
+
+
+def normalize_query(query: str) -> str:
+    """
+    Canonical form of a search query: lowercased, punctuation and filler words
+    removed. Token order is kept, since "flights from A to B" and "flights
+    from B to A" are different searches.
+    """
+    tokens = re.findall(r"\w+", query.lower())
+    return " ".join(t for t in tokens if t not in _STOPWORDS)
+
+
+class SearchCache:
+    """
+    Process-wide TTL + LRU cache for search results, shared by all agents and
+    requests. Thread-safe so it can be used from the search thread pool.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, max_results: int) -> tuple:
+        return (normalize_query(query), max_results)
+
+    def get(self, query: str, max_results: int) -> List[Dict[str, Any]] | None:
+        key = self.key(query, max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Copies so callers can't mutate the cached results
+            return [dict(r) for r in entry[1]]
+
+    def set(self, query: str, max_results: int, results: List[Dict[str, Any]]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self.key(query, max_results)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, [dict(r) for r in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+search_cache = SearchCache(SEARCH_CACHE_TTL_SECONDS, SEARCH_CACHE_MAX_ENTRIES)
+search_latency = LatencyWindow()
+search_breaker = CircuitBreaker(SEARCH_BREAKER_FAILURES, SEARCH_BREAKER_COOLDOWN_SECONDS)
+
+metrics.registry.gauge("travel_search_breaker_open", "1 while DuckDuckGo searches are skipped by the circuit breaker",
+                       lambda: float(search_breaker.state == CircuitBreaker.OPEN))
+metrics.registry.gauge("travel_search_hedge_delay_seconds", "Current delay before a search is hedged",
+                       lambda: hedge_delay())
+
+
+class SearchUnavailableError(RuntimeError):
+    """Raised instead of searching while the circuit breaker is open."""
+
+
+def hedge_delay() -> float:
+    """Recent p95 search latency: a query slower than that gets a duplicate request."""
+    p95 = search_latency.quantile(0.95)
+    return max(SEARCH_HEDGE_MIN_SECONDS, p95 if p95 is not None else SEARCH_HEDGE_DEFAULT_SECONDS)
+
+
+def _ddg_search(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Blocking DuckDuckGo text search, normalized to title/url/snippet dicts."""
+    request = f"{max_results}\n{query}"
+    if replaying():
+        return search_cassette.replay("ddg", request)["response"]
+
+    from duckduckgo_search import DDGS
+
+    start = time.perf_counter()
+    try:
+        with DDGS() as ddgs:
+            results = list(ddgs.text(query, max_results=max_results))
+    finally:
+        SEARCH_DURATION.observe(time.perf_counter() - start)
+
+    formatted_results = []
+    for r in results:
+        formatted_results.append({
+            "title": r.get("title", ""),
+            "url": r.get("href", r.get("link", "")),
+            "snippet": r.get("body", r.get("snippet", ""))
+        })
+
+    if recording():
+        search_cassette.record("ddg", request, formatted_results, (time.perf_counter() - start) * 1000)
+    return formatted_results
+
+
+def _search_attempt(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """One DuckDuckGo request; its latency feeds the hedge delay."""
+    start = time.perf_counter()
+    results = _ddg_search(query, max_results)
+    search_latency.observe(time.perf_counter() - start)
+    return results
+
+
+async def _hedged_search(query: str, max_results: int, timeout: float) -> List[Dict[str, Any]]:
+    """
+    Runs attempts on the search thread pool until one succeeds: a hedge when
+    the latest attempt is slower than `hedge_delay()`, a retry as soon as one
+    fails, up to SEARCH_MAX_ATTEMPTS and while time is left. The first
+    successful result wins.
+
+    The circuit breaker hears once per query, not per attempt: a success, or
+    a failure when every attempt failed. A query that runs out of time with
+    attempts still in flight reports neither, since those may yet succeed.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = hedge_delay()
+    pending = set()
+    attempts = 0
+    last_error: BaseException | None = None
+
+    def launch(kind: str) -> None:
+        nonlocal attempts
+        attempts += 1
+        SEARCH_ATTEMPTS.inc(kind=kind)
+        pending.add(loop.run_in_executor(_search_executor, _search_attempt, query, max_results))
+
+    launch("first")
+    try:
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            can_launch = attempts < SEARCH_MAX_ATTEMPTS
+            done, pending = await asyncio.wait(
+                pending, timeout=min(remaining, delay) if can_launch else remaining,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for attempt in done:
+                if attempt.exception() is None:
+                    search_breaker.record_success()
+                    return attempt.result()
+                last_error = attempt.exception()
+            if can_launch and deadline - loop.time() > 0 and search_breaker.allow():
+                launch("retry" if done else "hedge")
+    finally:
+        # Threads already running can't be interrupted; their results are dropped
+        for attempt in pending:
+            attempt.cancel()
+
+    if last_error is not None and not pending:
+        search_breaker.record_failure()
+        raise last_error
+    search_breaker.record_abandoned()
+    raise asyncio.TimeoutError(f"Search for '{query}' timed out after {timeout}s")
+
 
 @tool
 def web_search_tool(query: str, max_results: int = 6) -> List[Dict[str, Any]]:
@@ -13,25 +221,85 @@ def web_search_tool(query: str, max_results: int = 6) -> List[Dict[str, Any]]:
     Returns:
         List of search results with title, url, and snippet
     """
+    cached = search_cache.get(query, max_results)
+    if cached is not None:
+        SEARCH_CALLS.inc(outcome="hit")
+        return cached
+    if not search_breaker.allow():
+        SEARCH_CALLS.inc(outcome="skipped")
+        return []
+
     try:
-        from duckduckgo_search import DDGS
+        results = _search_attempt(query, max_results)
+    except Exception as e:
+        search_breaker.record_failure()
+        # No results rather than an error message the model would read as one
+        SEARCH_CALLS.inc(outcome="error")
+        print(f"Search error for '{query}': {e!r}")
+        return []
+    search_breaker.record_success()
+    search_cache.set(query, max_results, results)
+    SEARCH_CALLS.inc(outcome="miss")
+    return results
 
-        with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=max_results))
 
-        formatted_results = []
-        for r in results:
-            formatted_results.append({
-                "title": r.get("title", ""),
-                "url": r.get("href", r.get("link", "")),
-                "snippet": r.get("body", r.get("snippet", ""))
-            })
+async def async_web_search(
+    query: str,
+    max_results: int = 6,
+    timeout: float = SEARCH_TIMEOUT_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    Non-blocking web search. Served from the shared search cache when possible,
+    otherwise runs hedged DuckDuckGo calls on the search thread pool and gives
+    up after `timeout` seconds. Successful results are cached.
 
-        return formatted_results
+    Raises:
+        SearchUnavailableError while the circuit breaker is open,
+        asyncio.TimeoutError or the underlying search exception.
+    """
+    cached = search_cache.get(query, max_results)
+    if cached is not None:
+        SEARCH_CALLS.inc(outcome="hit")
+        return cached
+    if not search_breaker.allow():
+        SEARCH_CALLS.inc(outcome="skipped")
+        raise SearchUnavailableError("Web search is disabled by the circuit breaker")
 
-    except Exception as e:
-        return [{
-            "title": "Search Error",
-            "url": "",
-            "snippet": f"Unable to fetch search results: {str(e)}"
-        }]
+    try:
+        results = await _hedged_search(query, max_results, timeout)
+    except Exception:
+        SEARCH_CALLS.inc(outcome="error")
+        raise
+    search_cache.set(query, max_results, results)
+    SEARCH_CALLS.inc(outcome="miss")
+    return results
+
+
+async def search_all(
+    queries: List[str],
+    max_results: int = 6,
+    timeout: float = SEARCH_TIMEOUT_SECONDS,
+) -> List[Dict[str, Any]]:
+    """
+    Runs a list of queries concurrently and returns the combined results in
+    query order. A query that fails, times out or is skipped by the circuit
+    breaker contributes no results.
+    """
+    outcomes = await asyncio.gather(
+        *(async_web_search(q, max_results=max_results, timeout=timeout) for q in queries),
+        return_exceptions=True,
+    )
+
+    search_results = []
+    skipped = 0
+    for query, outcome in zip(queries, outcomes, strict=True):
+        if isinstance(outcome, SearchUnavailableError):
+            skipped += 1
+            continue
+        if isinstance(outcome, BaseException):
+            print(f"Search error for '{query}': {outcome!r}")
+            continue
+        search_results.extend(outcome)
+    if skipped:
+        print(f"Skipped {skipped} web searches: DuckDuckGo circuit breaker is open")
+    return search_results
@@ -0,0 +1,284 @@
+"""
+Offline benchmark suite for the trip-planning backend.
+
+Runs entirely offline: in mock mode (no GOOGLE_CLOUD_PROJECT, synthetic
+weather) with configurable artificial latency for web search, LLM and weather
+calls, or with --cassettes replaying recorded Vertex/DuckDuckGo traffic
+through the agents' real code paths (see app/core/cassettes.py). Measures:
+
+- nodes: latency of each agent node called directly, in pipeline order
+- graph: end-to-end `graph_app.ainvoke` latency, sequential and concurrent
+- api:   POST /plan?wait=true throughput at N concurrent clients, in-process
+         against the FastAPI app
+
+Results are written as JSON so runs can be compared:
+
+    cd backend
+    python -m benchmarks.run --search-ms 800 --llm-ms 2500 --clients 8
+    python -m benchmarks.run --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def configure_environment(args) -> None:
+    """Offline settings; must run before any `app` module is imported."""
+    os.environ.pop("GOOGLE_CLOUD_PROJECT", None)
+    os.environ["MOCK_WEATHER"] = "false" if args.live_weather else "true"
+    os.environ["MOCK_SEARCH_LATENCY_MS"] = str(args.search_ms)
+    os.environ["MOCK_LLM_LATENCY_MS"] = str(args.llm_ms)
+    os.environ["MOCK_WEATHER_LATENCY_MS"] = str(args.weather_ms)
+    os.environ["PLAN_CACHE_ENABLED"] = "true" if args.plan_cache else "false"
+    os.environ["COALESCE_RUNS"] = "true" if args.identical else "false"
+    os.environ["MAX_CONCURRENT_RUNS"] = str(args.max_concurrent_runs)
+    os.environ["PLAN_DEADLINE_SECONDS"] = str(args.deadline_s)
+    if args.cassettes:
+        os.environ["CASSETTE_MODE"] = "replay"
+        os.environ["CASSETTE_DIR"] = args.cassettes
+        # Every call should pay its replayed latency
+        os.environ["LLM_CACHE_ENABLED"] = "false"
+    # Keep benchmark trips out of the real database
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    p95_index = max(0, int(round(0.95 * len(ordered))) - 1)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 2),
+        "p50_ms": round(statistics.median(ordered), 2),
+        "p95_ms": round(ordered[p95_index], 2),
+        "min_ms": round(ordered[0], 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def make_spec(i: int, identical: bool):
+    from app.schemas.requests import TripSpec
+
+    destinations = ["Paris", "Tokyo", "New York", "Rome", "Barcelona", "London", "Lisbon", "Kyoto"]
+    # Distinct specs by default so neither the plan cache nor coalescing kicks in
+    n = 0 if identical else i
+    return TripSpec(
+        origin="New York",
+        destination=destinations[n % len(destinations)],
+        dates="2026-06-01 to 2026-06-05",
+        travelers=1 + n // len(destinations),
+        budget_tier="medium",
+        interests=["food", "museums"],
+        constraints=[],
+        travel_style="pleasure",
+    )
+
+
+async def timed(fn: Callable, *args) -> tuple[Any, float]:
+    start = time.perf_counter()
+    result = await fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+async def bench_nodes(iterations: int) -> Dict[str, Any]:
+    from app.agents.activities import activities_node
+    from app.agents.budget import budget_node
+    from app.agents.hotel import hotel_node
+    from app.agents.logistics import logistics_node
+    from app.agents.planner import planner_node
+    from app.agents.research import research_node
+    from app.agents.weather import weather_node
+    from app.graph.state import initial_state
+
+    nodes = [
+        ("research", research_node),
+        ("weather", weather_node),
+        ("hotel", hotel_node),
+        ("logistics", logistics_node),
+        ("activities", activities_node),
+        ("budget", budget_node),
+        ("planner", planner_node),
+    ]
+    samples: Dict[str, List[float]] = {name: [] for name, _ in nodes}
+    for i in range(iterations):
+        state = initial_state(make_spec(i, identical=False))
+        for name, node in nodes:
+            update, elapsed = await timed(node, state)
+            samples[name].append(elapsed)
+            state.update(update or {})
+    return {name: summarize(values) for name, values in samples.items()}
+
+
+async def bench_graph(iterations: int, concurrency: int) -> Dict[str, Any]:
+    from app.graph.graph import build_graph
+    from app.graph.state import initial_state
+
+    graph_app = build_graph()
+    sequential = []
+    for i in range(iterations):
+        _, elapsed = await timed(graph_app.ainvoke, initial_state(make_spec(i, identical=False)))
+        sequential.append(elapsed)
+
+    start = time.perf_counter()
+    concurrent = await asyncio.gather(*[
+        timed(graph_app.ainvoke, initial_state(make_spec(i, identical=False)))
+        for i in range(concurrency)
+    ])
+    wall = time.perf_counter() - start
+    return {
+        "sequential": summarize(sequential),
+        "concurrent": {
+            "runs": concurrency,
+            "wall_s": round(wall, 3),
+            "runs_per_s": round(concurrency / wall, 3),
+            **summarize([elapsed for _, elapsed in concurrent]),
+        },
+    }
+
+
+async def bench_api(clients: int, requests_per_client: int, identical: bool) -> Dict[str, Any]:
+    import httpx
+
+    from app.api.main import app
+    from app.db.database import create_db_and_tables
+
+    # ASGITransport doesn't run startup handlers
+    create_db_and_tables()
+    transport = httpx.ASGITransport(app=app)
+    latencies: List[float] = []
+    failures = 0
+    degraded = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def run_client(c: int) -> None:
+            nonlocal failures, degraded
+            for r in range(requests_per_client):
+                spec = make_spec(c * requests_per_client + r, identical)
+                start = time.perf_counter()
+                response = await client.post("/plan", params={"wait": "true"}, json=spec.model_dump())
+                latencies.append((time.perf_counter() - start) * 1000)
+                body = response.json() if response.status_code == 200 else {}
+                if body.get("status") != "completed":
+                    failures += 1
+                elif body.get("degraded_sections"):
+                    degraded += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*[run_client(c) for c in range(clients)])
+        wall = time.perf_counter() - start
+
+    total = clients * requests_per_client
+    return {
+        "clients": clients,
+        "requests": total,
+        "failures": failures,
+        "degraded": degraded,
+        "wall_s": round(wall, 3),
+        "requests_per_s": round(total / wall, 3),
+        **summarize(latencies),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], prefix: str = "") -> List[str]:
+    """Lines describing how every *_ms / *_per_s metric moved against `baseline`."""
+    lines = []
+    for key, value in current.items():
+        old = baseline.get(key) if isinstance(baseline, dict) else None
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            lines += compare(value, old or {}, name + ".")
+        elif isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+            if key.endswith(("_ms", "_per_s", "_s")):
+                lines.append(f"{name:45} {old:>12.2f} -> {value:>12.2f}  ({(value - old) / old:+.1%})")
+    return lines
+
+
+async def main(args) -> Dict[str, Any]:
+    results: Dict[str, Any] = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "config": {
+                "search_ms": args.search_ms,
+                "llm_ms": args.llm_ms,
+                "weather_ms": args.weather_ms,
+                "live_weather": args.live_weather,
+                "cassettes": args.cassettes,
+                "plan_cache": args.plan_cache,
+                "identical": args.identical,
+                "max_concurrent_runs": args.max_concurrent_runs,
+                "deadline_s": args.deadline_s,
+                "graph_mode": os.getenv("GRAPH_MODE", "parallel"),
+            },
+        }
+    }
+    suites = set(args.suites)
+    if "nodes" in suites:
+        results["nodes"] = await bench_nodes(args.iterations)
+    if "graph" in suites:
+        results["graph"] = await bench_graph(args.iterations, args.clients)
+    if "api" in suites:
+        results["api"] = await bench_api(args.clients, args.requests_per_client, args.identical)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the trip planner backend")
+    parser.add_argument("--suites", nargs="+", default=["nodes", "graph", "api"], choices=["nodes", "graph", "api"])
+    parser.add_argument("--iterations", type=int, default=5, help="sequential runs per node / graph benchmark")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent graph runs and API clients")
+    parser.add_argument("--requests-per-client", type=int, default=2)
+    parser.add_argument("--search-ms", type=float, default=0, help="artificial latency per web search round")
+    parser.add_argument("--llm-ms", type=float, default=0, help="artificial latency per LLM call")
+    parser.add_argument("--weather-ms", type=float, default=0, help="artificial latency per forecast fetch")
+    parser.add_argument("--live-weather", action="store_true", help="call Open-Meteo instead of synthetic forecasts")
+    parser.add_argument("--cassettes", help="replay recorded LLM/search cassettes from this directory")
+    parser.add_argument("--plan-cache", action="store_true", help="leave the whole-plan cache enabled")
+    parser.add_argument("--identical", action="store_true", help="API clients send one identical spec (coalescing)")
+    parser.add_argument("--max-concurrent-runs", type=int, default=4)
+    parser.add_argument("--deadline-s", type=float, default=0,
+                        help="per-run latency budget (PLAN_DEADLINE_SECONDS); 0 runs every node to completion")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to diff against")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    configure_environment(args)
+    results = asyncio.run(main(args))
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({k: v for k, v in results.items() if k != "meta"}, indent=2))
+    print(f"\nResults written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {args.compare}:")
+        current = {k: v for k, v in results.items() if k != "meta"}
+        print("\n".join(compare(current, baseline)) or "(no comparable metrics)")
@@ -59,13 +59,20 @@ async def test_agents():
         messages=[],
         research_notes="",
         weather_info="",
+        weather_data=[],
         hotel_recommendations="",
         budget_breakdown="",
         logistics_info="",
+        hotels=[],
+        transport_options=[],
+        budget=None,
         activities_recommendations="",
         revision_count=0,
         status="pending",
-        plan_quality_score=0
+        plan_quality_score=0,
+        node_fingerprints={},
+        deadline_at=None,
+        degraded_sections=[]
     )
 
     # Test each agent
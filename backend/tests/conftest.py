@@ -0,0 +1,52 @@
+"""
+Shared fixtures. The app reads DATABASE_URL when app.db.database is first
+imported, so it is pointed at a throwaway SQLite file before any app import.
+"""
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="travel-book-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+
+import pytest  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+from app.db.database import create_db_and_tables, engine  # noqa: E402
+from app.schemas.itinerary import BudgetBreakdown, DailyPlan, TripPlan  # noqa: E402
+from app.schemas.requests import TripSpec  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A fresh, empty schema for each test."""
+    SQLModel.metadata.drop_all(engine)
+    create_db_and_tables()
+    yield engine
+
+
+@pytest.fixture
+def spec() -> TripSpec:
+    return TripSpec(
+        origin="New York",
+        destination="Tokyo",
+        dates="2026-05-01 to 2026-05-03",
+        travelers=2,
+        budget_tier="medium",
+        interests=["sushi", "history"],
+        travel_style="cultural",
+    )
+
+
+@pytest.fixture
+def plan() -> TripPlan:
+    return TripPlan(
+        title="Tokyo Trip",
+        summary="Three days in Tokyo",
+        itinerary=[DailyPlan(day_number=1, date="2026-05-01", city="Tokyo")],
+        hotels_shortlist=[],
+        intercity_travel=[],
+        budget=BudgetBreakdown(
+            flights=900, accommodation=450, activities=150, food=200, transport_local=60, total_estimated=1760
+        ),
+        packing_list=[],
+    )
@@ -0,0 +1,40 @@
+import pytest
+
+from app.tools.gazetteer import Gazetteer
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer()
+
+
+@pytest.mark.parametrize("query, name, country", [
+    ("New York, NY", "New York City", "US"),
+    ("Austin, TX", "Austin", "US"),
+    ("Portland, OR", "Portland", "US"),
+    ("Los Angeles, CA", "Los Angeles", "US"),
+    ("Miami, FL", "Miami", "US"),
+    ("Toronto, ON", "Toronto", "CA"),
+    ("Vancouver, BC", "Vancouver", "CA"),
+    ("London, UK", "London", "GB"),
+    ("London, ON", "London", "CA"),
+    ("Paris, TX", "Paris", "US"),
+    ("Paris, FR", "Paris", "FR"),
+    ("Sydney, NSW, Australia", "Sydney", "AU"),
+])
+def test_qualified_lookup(gazetteer, query, name, country):
+    place = gazetteer.lookup(query)
+    assert place is not None
+    assert (place.name, place.country_code) == (name, country)
+
+
+def test_unmatched_qualifier_falls_back_to_best_match(gazetteer):
+    # No Rome in Georgia in the seed file: the most populous Rome wins
+    place = gazetteer.lookup("Rome, GA")
+    assert (place.name, place.country_code) == ("Rome", "IT")
+    assert gazetteer.lookup("Paris, France").country_code == "FR"
+
+
+def test_short_inputs_do_not_match_partially(gazetteer):
+    assert gazetteer.lookup("Port") is None
+    assert gazetteer.lookup("Atlantis") is None
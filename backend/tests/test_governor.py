@@ -0,0 +1,40 @@
+import asyncio
+
+import pytest
+from google.api_core.exceptions import ResourceExhausted
+from langchain_core.exceptions import OutputParserException
+
+from app.core.governor import VertexGovernor, is_rate_limited
+
+
+class HttpError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_rate_limit_classification():
+    assert is_rate_limited(ResourceExhausted("Quota exceeded"))
+    assert is_rate_limited(HttpError(429))
+    wrapped = RuntimeError("call failed")
+    wrapped.__cause__ = ResourceExhausted("quota")
+    assert is_rate_limited(wrapped)
+
+    assert not is_rate_limited(HttpError(500))
+    assert not is_rate_limited(OutputParserException("Invalid json output: {\"price\": \"$429\"}"))
+    assert not is_rate_limited(ValueError("Error 429 in the response text"))
+
+
+def test_non_throttling_errors_are_not_retried():
+    governor = VertexGovernor(max_concurrency=4, retry_base_seconds=0)
+    calls = 0
+
+    async def fn(permit):
+        nonlocal calls
+        calls += 1
+        raise OutputParserException("Invalid json output: $429 per night")
+
+    with pytest.raises(OutputParserException):
+        asyncio.run(governor.call("hotel", 3, 100, fn))
+    assert calls == 1
+    assert governor.limit == 4
@@ -0,0 +1,83 @@
+import asyncio
+
+from app.api.jobs import JobManager, QueueFullError
+
+
+class FakeGraph:
+    """Stands in for the compiled graph: the planner node reports `plan`."""
+
+    def __init__(self, plan, delay: float = 0.0):
+        self.plan = plan
+        self.delay = delay
+        self.runs = 0
+
+    async def astream(self, state, stream_mode=None):
+        self.runs += 1
+        await asyncio.sleep(self.delay)
+        yield "updates", {"planner": {"plan": self.plan}}
+
+
+async def _failing_on_complete(job):
+    raise RuntimeError("database is locked")
+
+
+def test_on_complete_failure_keeps_the_plan(spec, plan):
+    async def scenario():
+        manager = JobManager(FakeGraph(plan), on_complete=_failing_on_complete)
+        job = await manager.wait(await manager.submit(spec))
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == "completed"
+    assert job.plan == plan
+    assert job.error is None
+
+
+def test_follower_keeps_the_plan_when_on_complete_fails(spec, plan):
+    async def scenario():
+        manager = JobManager(FakeGraph(plan, delay=0.05), on_complete=_failing_on_complete)
+        leader = await manager.submit(spec)
+        follower = await manager.submit(spec)
+        await manager.wait(leader)
+        await manager.wait(follower)
+        return manager, leader, follower
+
+    manager, leader, follower = asyncio.run(scenario())
+    assert follower.coalesced_with == leader.run_id
+    assert manager.graph.runs == 1
+    assert follower.status == "completed"
+    assert follower.plan == plan
+
+
+def test_followers_count_against_the_queue_limit(spec, plan):
+    async def scenario():
+        manager = JobManager(FakeGraph(plan, delay=0.05), max_queued_runs=2)
+        await manager.submit(spec)
+        await manager.submit(spec)  # follower
+        try:
+            await manager.submit(spec)
+        except QueueFullError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+
+
+def test_submit_while_another_job_is_storing_its_plan(spec, plan):
+    async def scenario():
+        storing = asyncio.Event()
+        release = asyncio.Event()
+
+        async def slow_on_complete(job):
+            storing.set()
+            await release.wait()
+
+        manager = JobManager(FakeGraph(plan), on_complete=slow_on_complete, coalesce=False)
+        first = await manager.submit(spec)
+        await storing.wait()
+        second = await manager.submit(spec)  # prunes while `first` is completed but unfinished
+        release.set()
+        return await manager.wait(first), await manager.wait(second)
+
+    first, second = asyncio.run(scenario())
+    assert first.status == second.status == "completed"
@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from sqlmodel import Session
+
+from app.core.spec_key import spec_key
+from app.db import plan_cache
+from app.db.models import PlanCacheEntry, utcnow
+
+
+def test_cached_plan_round_trip(db, spec, plan):
+    assert plan_cache.get_cached_plan(spec) is None
+
+    plan_cache.cache_plan(spec, plan)
+    assert plan_cache.get_cached_plan(spec) == plan
+    # Same trip, different spelling
+    assert plan_cache.get_cached_plan(spec.model_copy(update={"destination": "  tokyo "})) == plan
+
+
+def test_expired_plan_is_evicted(db, spec, plan):
+    plan_cache.cache_plan(spec, plan)
+    with Session(db) as session:
+        entry = session.get(PlanCacheEntry, spec_key(spec))
+        entry.created_at = utcnow() - timedelta(seconds=plan_cache.PLAN_CACHE_TTL_SECONDS + 60)
+        session.add(entry)
+        session.commit()
+
+    assert plan_cache.get_cached_plan(spec) is None
+    with Session(db) as session:
+        assert session.get(PlanCacheEntry, spec_key(spec)) is None
@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+
+from app.agents import budget, hotel, logistics
+from app.core import llm
+from app.graph.deadlines import with_deadline
+
+
+class MalformedLLM:
+    """JSON-mode LLM whose response doesn't parse into the requested schema."""
+
+    async def ainvoke(self, prompt_value):
+        raw = AIMessage(content='{"hotels": [{"name": "Half a hot')
+        return {"raw": raw, "parsed": None, "parsing_error": OutputParserException("Invalid json output")}
+
+
+class FakeRegistry:
+    def __init__(self):
+        self._real = llm.LLMRegistry(project="test-project")
+
+    def get_prompt(self, name):
+        return self._real.get_prompt(name)
+
+    def get_structured_llm(self, name, schema):
+        return MalformedLLM()
+
+
+@pytest.fixture
+def malformed_model(monkeypatch):
+    # A configured project takes the agents off their mock paths
+    monkeypatch.setenv("GOOGLE_CLOUD_PROJECT", "test-project")
+    monkeypatch.setattr(llm, "get_registry", lambda: FakeRegistry())
+
+    async def no_results(queries, max_results=6, timeout=None):
+        return []
+
+    for module in (hotel, logistics, budget):
+        monkeypatch.setattr(module, "search_all", no_results)
+
+
+@pytest.mark.parametrize("name, node, output_key", [
+    ("hotel", hotel.hotel_node, "hotels"),
+    ("logistics", logistics.logistics_node, "transport_options"),
+    ("budget", budget.budget_node, "budget"),
+])
+@pytest.mark.parametrize("budget_seconds", [180, 0])
+def test_malformed_response_serves_the_fallback(malformed_model, spec, name, node, output_key, budget_seconds):
+    state = {"spec": spec}
+    with pytest.raises(llm.StructuredOutputError):
+        asyncio.run(node(state))
+
+    output = asyncio.run(with_deadline(name, budget_seconds)(node)(state))
+    assert output[output_key]
+    assert output["degraded_sections"] == [name]
@@ -0,0 +1,15 @@
+from app.db import trips as trip_store
+
+
+def test_save_trip_round_trip(db, plan):
+    trip_store.save_trip("run-1", "Tokyo", plan)
+
+    assert trip_store.get_trip("run-1") == plan
+    [summary] = trip_store.list_trips()
+    assert summary["id"] == "run-1"
+    assert summary["destination"] == "Tokyo"
+    assert summary["created_at"].tzinfo is not None
+
+
+def test_get_unknown_trip(db):
+    assert trip_store.get_trip("missing") is None
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.resilience import CircuitBreaker
+from app.tools import web_search
+
+
+@pytest.fixture
+def search(monkeypatch):
+    """Fresh breaker and cache, a fixed hedge delay and a scriptable DuckDuckGo."""
+    breaker = CircuitBreaker(failure_threshold=2, cooldown_seconds=60)
+    monkeypatch.setattr(web_search, "search_breaker", breaker)
+    monkeypatch.setattr(web_search, "SEARCH_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(web_search, "hedge_delay", lambda: 0.05)
+    web_search.search_cache.clear()
+    calls = []
+
+    def use(ddg):
+        def recorded(query, max_results):
+            calls.append(query)
+            return ddg(query, max_results)
+        monkeypatch.setattr(web_search, "_ddg_search", recorded)
+
+    yield breaker, calls, use
+    web_search.search_cache.clear()
+
+
+def test_failed_query_counts_once_toward_the_breaker(search):
+    breaker, calls, use = search
+
+    def failing(query, max_results):
+        raise ConnectionError("boom")
+    use(failing)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(web_search.async_web_search("museums in Lisbon", timeout=2))
+    assert len(calls) == 3
+    assert breaker.failures == 1
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_timeout_with_attempts_in_flight_is_not_a_failure(search):
+    breaker, calls, use = search
+    release = threading.Event()
+
+    def hanging(query, max_results):
+        release.wait(2)
+        return []
+    use(hanging)
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(web_search.async_web_search("hotels in Porto", timeout=0.12))
+    finally:
+        release.set()
+    assert breaker.failures == 0
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_no_attempt_after_the_deadline(search, monkeypatch):
+    breaker, calls, use = search
+    release = threading.Event()
+
+    def hanging(query, max_results):
+        release.wait(2)
+        return []
+    use(hanging)
+    monkeypatch.setattr(web_search, "hedge_delay", lambda: 1.0)
+
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(web_search.async_web_search("trains to Sintra", timeout=0.1))
+    finally:
+        release.set()
+    assert len(calls) == 1
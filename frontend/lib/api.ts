@@ -2,7 +2,10 @@ import { TripSpec, TripPlan } from './types';
 
 const API_BASE = 'http://localhost:8000';
 
+const POLL_INTERVAL_MS = 2000;
+
 export async function createPlan(spec: TripSpec): Promise<TripPlan> {
+    // POST /plan queues the run and returns a run_id right away
     const res = await fetch(`${API_BASE}/plan`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
@@ -13,11 +16,27 @@ export async function createPlan(spec: TripSpec): Promise<TripPlan> {
         throw new Error('Failed to generate plan');
     }
 
-    const data = await res.json();
-    if (data.status === 'failed') {
-        throw new Error(data.error || 'Plan generation failed');
+    const { run_id, status, plan } = await res.json();
+    // Cached plans come back completed straight away
+    if (status === 'completed') {
+        return plan;
+    }
+
+    // Poll the run until the graph finishes
+    while (true) {
+        await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        const statusRes = await fetch(`${API_BASE}/trips/${run_id}`);
+        if (!statusRes.ok) {
+            throw new Error('Failed to fetch plan status');
+        }
+        const data = await statusRes.json();
+        if (data.status === 'completed') {
+            return data.plan;
+        }
+        if (data.status === 'failed') {
+            throw new Error(data.error || 'Plan generation failed');
+        }
     }
-    return data.plan;
 }
 
 export async function getTrips() {
@@ -7,6 +7,7 @@ export interface TripSpec {
     interests: string[];
     constraints: string[];
     travel_style: string;
+    force_refresh?: boolean;
 }
 
 export interface Activity {
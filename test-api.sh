@@ -20,7 +20,7 @@ echo ""
 echo "2️⃣  Testing Plan Generation..."
 echo "   Sending request to create Paris trip plan..."
 
-RESPONSE=$(curl -s -X POST http://localhost:8000/plan \
+RESPONSE=$(curl -s -X POST "http://localhost:8000/plan?wait=true" \
   -H 'Content-Type: application/json' \
   -d '{
     "origin": "New York",